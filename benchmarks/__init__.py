@@ -0,0 +1,10 @@
+# Throughput benchmarks for target-mako.
+#
+# They are not part of the test suite, run them from the repository root with:
+#
+#     python -m benchmarks.<module_name>
+#
+# benchmarks.pipeline runs synthetic streams made by benchmarks.stream_generator through persist_lines for each
+# sample template configuration, and writes the throughput and the time spent in each stage as JSON:
+#
+#     python -m benchmarks.pipeline --records 10000 --streams 2 --schema-width 50 --output results.json
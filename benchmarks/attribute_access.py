@@ -0,0 +1,21 @@
+import timeit
+
+from target_mako.dict_proxy import lazy_namespace, set_missing_attribute_report, wrap_namespace
+
+ACCESS_COUNT = 200000
+
+
+def main():
+    record = {"id": 1, "name": "Ward", "color": None}
+    wrappers = [("wrap_namespace", wrap_namespace(record)), ("lazy_namespace", lazy_namespace(record))]
+    for mode in ('off', 'aggregate', 'debug'):
+        set_missing_attribute_report(mode)
+        for wrapper_name, record_values in wrappers:
+            hit = timeit.timeit(lambda: record_values.name, number=ACCESS_COUNT)
+            missing = timeit.timeit(lambda: record_values.invalid, number=ACCESS_COUNT)
+            print("{:<10} {:<15} hit: {:>6.2f} M access/s  missing: {:>6.2f} M access/s"
+                  .format(mode, wrapper_name, ACCESS_COUNT / hit / 1e6, ACCESS_COUNT / missing / 1e6))
+
+
+if __name__ == '__main__':
+    main()
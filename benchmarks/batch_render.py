@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+
+from target_mako import load_template_list_from_config, open_output_file_list, process_record, \
+    render_footers_and_close_output_files
+from target_mako.dict_proxy import lazy_namespace
+from target_mako.formatting_functions import create_rendering_functions
+from target_mako.validation import RecordValidator
+
+STREAM = "bench-stream"
+RECORD_COUNT = 50000
+LINE = "${record.id};${record.name};${record.color};${record.price} EUR;${functions['lfixed'](record.code, 8)}"
+
+
+def build_record(index):
+    return {"id": index, "name": "Ward {}".format(index), "color": "red", "price": index * 1.5, "code": "C" + str(index)}
+
+
+def build_config(template_dir, output_dir, records_per_render):
+    with open(os.path.join(template_dir, "line.txt"), "w") as template_file:
+        template_file.write(LINE)
+    with open(os.path.join(template_dir, "batch_line.txt"), "w") as template_file:
+        template_file.write("% for record in records:\n" + LINE + "\n% endfor\n")
+    template_config = {
+        "header_template_name": "",
+        "data_template_name": "line.txt",
+        "footer_template_name": "",
+        "output_file_name": "sample.csv"
+    }
+    if records_per_render:
+        template_config.update({"data_template_name": "batch_line.txt", "records_per_render": records_per_render})
+    return {
+        "template_dir": template_dir,
+        "cache_template_dir": template_dir + "/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [template_config]
+    }
+
+
+def render(config, records):
+    schema = {"type": "object"}
+    templates = {STREAM: load_template_list_from_config(config, STREAM)}
+    outputs = {STREAM: open_output_file_list(config, templates[STREAM], STREAM)}
+    validators = {STREAM: RecordValidator(STREAM, schema, 'off')}
+    rendering_functions = create_rendering_functions()
+    start = time.perf_counter()
+    for index, record in enumerate(records):
+        record_values, schema_values, _, _ = process_record(config, index, index + 1,
+                                                            {"stream": STREAM, "record": dict(record)}, outputs,
+                                                            {STREAM: schema}, templates, validators,
+                                                            rendering_functions)
+    render_footers_and_close_output_files(outputs, {STREAM: record_values}, {STREAM: lazy_namespace(schema)},
+                                          templates, rendering_functions)
+    return time.perf_counter() - start
+
+
+def run(records, records_per_render=None):
+    with tempfile.TemporaryDirectory() as template_dir, tempfile.TemporaryDirectory() as output_dir:
+        elapsed = render(build_config(template_dir, output_dir, records_per_render), records)
+        with open(output_dir + "/sample.csv", encoding="utf8") as input_file:
+            return elapsed, input_file.read()
+
+
+def main():
+    records = [build_record(index) for index in range(RECORD_COUNT)]
+    print("records: {}".format(RECORD_COUNT))
+    per_record_elapsed, per_record_output = run(records)
+    print("one render per record    : {:.0f} records/s".format(RECORD_COUNT / per_record_elapsed))
+    for records_per_render in [10, 100, 1000]:
+        elapsed, output = run(records, records_per_render)
+        print("records_per_render {:<6}: {:.0f} records/s, same output: {}".format(
+            records_per_render, RECORD_COUNT / elapsed, output == per_record_output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+
+from target_mako import load_template_list_from_config, open_output_file, render_footer_and_close, \
+    render_templates_for_record
+from target_mako.columnar_output import ColumnarOutputFile
+from target_mako.dict_proxy import lazy_namespace
+from target_mako.formatting_functions import create_rendering_functions
+
+STREAM = "bench-stream"
+RECORD_COUNT = 20000
+FIELD_COUNT = 20
+# fixed width export: the fields are padded one after the other
+FUNCTIONS = ["lfixed", "rfixed", "nfixed"]
+
+
+def build_columns():
+    return [{"field": "field{}".format(index), "function": FUNCTIONS[index % 3], "width": 12}
+            for index in range(FIELD_COUNT)]
+
+
+def build_line_template(columns):
+    # the Mako data template giving the same lines as the columns
+    return "".join("${{functions['{}'](record.{}, {})}}".format(column["function"], column["field"], column["width"])
+                   for column in columns)
+
+
+def build_record(index):
+    record = {}
+    for field_index in range(FIELD_COUNT):
+        record["field{}".format(field_index)] = "value {}".format(index) if field_index % 2 else index * field_index
+    return record
+
+
+def build_config(template_dir, output_dir, columns, template_type):
+    with open(os.path.join(template_dir, "line.txt"), "w") as template_file:
+        template_file.write(build_line_template(columns))
+    return {
+        "template_dir": template_dir,
+        "cache_template_dir": template_dir + "/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [
+            {
+                "header_template_name": "",
+                "data_template_name": "line.txt",
+                "footer_template_name": "",
+                "output_file_name": "sample.txt",
+                "template_type": template_type,
+                "columns": columns
+            }
+        ]
+    }
+
+
+def render_mako(config, records):
+    templates = load_template_list_from_config(config, STREAM)[0]
+    rendering_functions = create_rendering_functions()
+    schema_values = lazy_namespace({}, 'schema')
+    output_file_path = config["output_dir"] + "/" + templates["output_filename"]
+    start = time.perf_counter()
+    output_file = open_output_file(config, output_file_path, templates, STREAM)
+    for line_index, record in enumerate(records):
+        record_values = lazy_namespace(record, 'record')
+        render_templates_for_record(line_index, False, output_file, record_values, schema_values, templates,
+                                    rendering_functions)
+    render_footer_and_close(output_file, record_values, schema_values, templates, rendering_functions)
+    return time.perf_counter() - start
+
+
+def render_columnar(config, records):
+    templates = load_template_list_from_config(config, STREAM)[0]
+    rendering_functions = create_rendering_functions()
+    schema_values = lazy_namespace({}, 'schema')
+    start = time.perf_counter()
+    output_file = ColumnarOutputFile(config, templates, STREAM)
+    for record in records:
+        output_file.render_record(record, lazy_namespace(record, 'record'), schema_values, rendering_functions)
+    output_file.render_footers_and_close(rendering_functions)
+    return time.perf_counter() - start
+
+
+def run(render, template_type, records):
+    with tempfile.TemporaryDirectory() as template_dir, tempfile.TemporaryDirectory() as output_dir:
+        config = build_config(template_dir, output_dir, build_columns(), template_type)
+        elapsed = render(config, records)
+        with open(output_dir + "/sample.txt", encoding="utf8") as input_file:
+            return elapsed, input_file.read()
+
+
+def main():
+    records = [build_record(index) for index in range(RECORD_COUNT)]
+    print("records: {}, fields: {}".format(RECORD_COUNT, FIELD_COUNT))
+    mako_elapsed, mako_output = run(render_mako, "mako", records)
+    print("mako template     : {:.0f} records/s".format(RECORD_COUNT / mako_elapsed))
+    columnar_elapsed, columnar_output = run(render_columnar, "columnar", records)
+    print("columnar template : {:.0f} records/s".format(RECORD_COUNT / columnar_elapsed))
+    print("same output       : {}".format(mako_output == columnar_output))
+
+
+if __name__ == '__main__':
+    main()
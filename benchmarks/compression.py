@@ -0,0 +1,32 @@
+import tempfile
+import time
+
+from target_mako.compression import open_compressed_file
+
+LINE = b"4529370162;Ward;0;11:05:30 PM;20;10;red;-6013876.97 EUR; giuWZuYElGsAQRrAVkwoPhEkmGYAEW | KxRwOKWSnFSk |\r\n"
+LINE_COUNT = 200000
+# writes of the size done by the text layer
+CHUNK = LINE * 80
+
+
+def write_compressed(output_file_path, compression, threads=None):
+    start = time.perf_counter()
+    output_file = open_compressed_file(output_file_path, compression, threads=threads)
+    for _ in range(LINE_COUNT // 80):
+        output_file.write(CHUNK)
+    output_file.close()
+    return time.perf_counter() - start
+
+
+def main():
+    size = len(LINE) * LINE_COUNT / 1e6
+    print("uncompressed: {:.0f} MB".format(size))
+    with tempfile.TemporaryDirectory() as output_dir:
+        for compression, threads in [("gzip", None), ("gzip", 2), ("gzip", 4), ("bz2", None), ("xz", None)]:
+            elapsed = write_compressed(output_dir + "/sample." + compression, compression, threads)
+            print("{:<5} {:<10}: {:.0f} MB/s".format(compression, "{} threads".format(threads) if threads else "",
+                                                     size / elapsed))
+
+
+if __name__ == '__main__':
+    main()
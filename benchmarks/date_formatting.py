@@ -0,0 +1,46 @@
+import time
+from datetime import datetime, timedelta
+
+from target_mako.formatting_functions import configure_date_format_cache, format_json_date, parse_and_format_date
+
+CALL_COUNT = 200000
+DISTINCT_DATES = 3000
+OUTPUT_DATE_FORMAT = '%d/%m/%Y'
+
+
+def build_dates():
+    first_date = datetime(2015, 1, 1)
+    return [(first_date + timedelta(days=index % DISTINCT_DATES)).strftime('%Y-%m-%d') for index in range(CALL_COUNT)]
+
+
+def strptime_format_json_date(input_value, date_format):
+    # format_json_date before the cache and the ISO fast path, for comparison
+    return datetime.strptime(str(input_value), '%Y-%m-%d').strftime(date_format)
+
+
+def iso_format_json_date(input_value, date_format):
+    return parse_and_format_date(str(input_value), '%Y-%m-%d', date_format)
+
+
+def run(function, dates):
+    start = time.perf_counter()
+    for json_date in dates:
+        function(json_date, OUTPUT_DATE_FORMAT)
+    return time.perf_counter() - start
+
+
+def main():
+    dates = build_dates()
+    print("calls: {}, distinct dates: {}".format(CALL_COUNT, DISTINCT_DATES))
+    for name, function, cache_size in [("strptime", strptime_format_json_date, None),
+                                       ("ISO fast path", iso_format_json_date, None),
+                                       ("cached, size 10000", format_json_date, 10000),
+                                       ("cached, size 1000", format_json_date, 1000)]:
+        if cache_size is not None:
+            configure_date_format_cache(cache_size)
+        elapsed = run(function, dates)
+        print("{:<18}: {:.0f} ns/call".format(name, elapsed / CALL_COUNT * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import timeit
+
+from target_mako.formatting_functions import create_rendering_functions
+
+CALL_COUNT = 200000
+
+# arguments of each rendering function, a function added to create_rendering_functions must be added here
+SAMPLE_ARGUMENTS = {
+    'format_date': ("28/08/2020", '%d/%m/%Y', '%d%m%Y'),
+    'format_json_date': ("2020-08-28", '%d/%m/%Y'),
+    'fixed_size': ("some content", 30),
+    'lfixed': ("some content", 30),
+    'rfixed': ("some content", 30),
+    'nfixed': (12345, 10),
+    'null_safe': (None,),
+    'lower': ("Some Content",),
+    'upper': ("Some Content",)
+}
+
+
+def format_fixed_size(input_value, string_size, prefix="{:<", postfix="}"):
+    # fixed_size before its format strings were cached, for comparison
+    json_string = str(input_value)
+    return (prefix + str(string_size) + postfix).format(json_string[:string_size])
+
+
+def run(function, arguments):
+    return min(timeit.repeat(lambda: function(*arguments), number=CALL_COUNT, repeat=5)) / CALL_COUNT
+
+
+def main():
+    functions = create_rendering_functions()
+    missing = set(functions) - set(SAMPLE_ARGUMENTS)
+    if missing:
+        raise Exception("No sample arguments for {}".format(sorted(missing)))
+    print("calls: {}".format(CALL_COUNT))
+    for name, function in functions.items():
+        print("{:<17}: {:.0f} ns/call".format(name, run(function, SAMPLE_ARGUMENTS[name]) * 1e9))
+    print("{:<17}: {:.0f} ns/call".format("format (before)", run(format_fixed_size, SAMPLE_ARGUMENTS['lfixed']) * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import time
+
+from target_mako import generate_output_file_path, get_or_open_file_for_template, load_template_list_from_config
+from target_mako.output_writer import create_output_write_pool
+
+STREAM = "bench-stream"
+FILE_COUNT = 5000
+# file creation time varies a lot from run to run, the best of several runs is kept
+REPEAT = 5
+TEXT = '{"id": 4529370162, "name": "Ward", "color": "red", "price": -6013876.97}\n'
+
+
+def build_config(output_dir, output_buffer_size=None, output_write_threads=None):
+    config = {
+        "template_dir": "templates",
+        "cache_template_dir": tempfile.gettempdir() + "/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [
+            {
+                "header_template_name": "",
+                "data_template_name": "json/sample.template.json",
+                "footer_template_name": "",
+                "output_file_name": "{color}/sample{record_index}.json",
+                "one_file_per_record": True
+            }
+        ]
+    }
+    if output_buffer_size:
+        config["output_buffer_size"] = output_buffer_size
+    if output_write_threads:
+        config["output_write_threads"] = output_write_threads
+    return config
+
+
+def write_files_before(config):
+    # file name formatted, directory created and text file opened for each record
+    templates = load_template_list_from_config(config, STREAM)[0]
+    start = time.perf_counter()
+    for index in range(FILE_COUNT):
+        output_file_path = generate_output_file_path(config, templates['output_filename'],
+                                                     {"color": "red", "record_index": index}, STREAM)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        with open(output_file_path, "w+", encoding="utf8", newline="\r\n") as output_file:
+            output_file.write(TEXT)
+    return time.perf_counter() - start
+
+
+def write_files(config):
+    templates = load_template_list_from_config(config, STREAM)[0]
+    write_pool = create_output_write_pool(config)
+    templates['output_write_pool'] = write_pool
+    start = time.perf_counter()
+    for index in range(FILE_COUNT):
+        output_file = get_or_open_file_for_template(config, True, {}, {"color": "red", "record_index": index},
+                                                    templates, STREAM)
+        output_file.write(TEXT)
+        output_file.close()
+    if write_pool is not None:
+        write_pool.wait()
+        write_pool.close()
+    return time.perf_counter() - start
+
+
+def best_time(write, base_dir, output_buffer_size=None, output_write_threads=None):
+    elapsed = []
+    for _ in range(REPEAT):
+        with tempfile.TemporaryDirectory(dir=base_dir) as output_dir:
+            elapsed.append(write(build_config(output_dir, output_buffer_size, output_write_threads)))
+    return min(elapsed)
+
+
+def main():
+    # a memory file system (/dev/shm for example) shows the cost of the target instead of the disk
+    base_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    print("files: {}, best of {} runs, in {}".format(FILE_COUNT, REPEAT, base_dir or tempfile.gettempdir()))
+    before = best_time(write_files_before, base_dir)
+    print("makedirs + text file per record:         {:.0f} files/s".format(FILE_COUNT / before))
+    text_files = best_time(write_files, base_dir)
+    print("cached pattern and directory:            {:.0f} files/s".format(FILE_COUNT / text_files))
+    one_shot_files = best_time(write_files, base_dir, 64 * 1024)
+    print("one shot os.write (output_buffer_size):  {:.0f} files/s".format(FILE_COUNT / one_shot_files))
+    for threads in [1, 4]:
+        write_pool_files = best_time(write_files, base_dir, None, threads)
+        print("write pool, {} threads:                   {:.0f} files/s".format(threads, FILE_COUNT / write_pool_files))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+import tempfile
+import time
+
+from target_mako.output_writer import open_buffered_output_writer
+
+LINE = "4529370162;Ward;0;11:05:30 PM;20;10;red;-6013876.97 EUR; giuWZuYElGsAQRrAVkwoPhEkmGYAEW | KxRwOKWSnFSk |\n"
+LINE_COUNT = 500000
+
+
+def write_lines(output_file):
+    start = time.perf_counter()
+    for _ in range(LINE_COUNT):
+        output_file.write(LINE)
+    output_file.close()
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as output_dir:
+        text_file = write_lines(open(output_dir + "/text.csv", "w+", encoding="utf8", newline="\r\n"))
+        print("text file:                 {:.0f} k lines/s".format(LINE_COUNT / text_file / 1e3))
+        for buffer_size in [64 * 1024, 1024 * 1024, 8 * 1024 * 1024]:
+            buffered_file = write_lines(open_buffered_output_writer(output_dir + "/buffered.csv", "utf8", "\r\n",
+                                                                    buffer_size))
+            print("buffered writer {:>5} KiB: {:.0f} k lines/s".format(buffer_size // 1024,
+                                                                      LINE_COUNT / buffered_file / 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.stream_generator import add_generator_arguments, generate_lines, generator_arguments
+from target_mako import persist_lines
+from target_mako.metrics import get_metrics
+
+# template_list of each scenario, run with the templates of the templates directory
+SCENARIOS = {
+    "csv": [
+        {
+            "header_template_name": "csv/sample_header.template.csv",
+            "data_template_name": "csv/sample.template.csv",
+            "footer_template_name": "",
+            "output_file_name": "sample.csv"
+        }
+    ],
+    "json": [
+        {
+            "header_template_name": "json/sample_header.template.json",
+            "data_template_name": "json/sample.template.json",
+            "footer_template_name": "json/sample_footer.template.json",
+            "output_file_name": "sample.json"
+        }
+    ],
+    "json_one_file_per_record": [
+        {
+            "header_template_name": "json/sample_header.template.json",
+            "data_template_name": "json/sample.template.json",
+            "footer_template_name": "json/sample_footer.template.json",
+            "output_file_name": "{color}/sample_{record_index}.json",
+            "one_file_per_record": True
+        }
+    ],
+    "json_one_file_per_record_buffered": [
+        {
+            "header_template_name": "json/sample_header.template.json",
+            "data_template_name": "json/sample.template.json",
+            "footer_template_name": "json/sample_footer.template.json",
+            "output_file_name": "{color}/sample_{record_index}.json",
+            "one_file_per_record": True,
+            "output_buffer_size": 64 * 1024
+        }
+    ]
+}
+
+
+def build_config(scenario, output_dir, streams, options=None):
+    config = {
+        "disable_collection": True,
+        "template_dir": "templates",
+        "cache_template_dir": tempfile.gettempdir() + "/mako_modules",
+        "output_dir": output_dir,
+        "template_list": SCENARIOS[scenario],
+        # the time spent in each stage is taken from the metrics summary
+        "metrics": True,
+        # each stream writes in its own directory, the file names do not contain the stream
+        "stream_configs": {"stream_{}".format(index): {"output_dir": "{}/stream_{}".format(output_dir, index)}
+                           for index in range(streams)}
+    }
+    config.update(options or {})
+    return config
+
+
+def run_scenario(scenario, lines, streams, repeat=3, base_dir=None, options=None):
+    """
+    Run persist_lines "repeat" times on the lines and return the result of the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(dir=base_dir) as output_dir:
+            config = build_config(scenario, output_dir, streams, options)
+            start = time.perf_counter()
+            persist_lines(config, iter(lines))
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, get_metrics().summary())
+    elapsed, metrics = best
+    records = sum(stream["records"] for stream in metrics["streams"].values())
+    return {
+        "scenario": scenario,
+        "options": options or {},
+        "lines": len(lines),
+        "records": records,
+        "seconds": elapsed,
+        "records_per_second": records / elapsed,
+        "lines_per_second": len(lines) / elapsed,
+        "stage_seconds": sum_stage_seconds(metrics),
+        "metrics": metrics
+    }
+
+
+def sum_stage_seconds(metrics):
+    stage_seconds = {"parse": metrics["parse_seconds"]}
+    for stream in metrics["streams"].values():
+        for stage, seconds in stream["stages"].items():
+            stage_seconds[stage] = stage_seconds.get(stage, 0) + seconds
+    return stage_seconds
+
+
+def get_environment():
+    try:
+        from importlib.metadata import version
+        target_version = version("target-mako")
+    except Exception:
+        target_version = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {"target_mako_version": target_version, "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform()}
+
+
+def print_results(results, output=sys.stderr):
+    output.write("{:<34} {:>12} {:>8}  {}\n".format("scenario", "records/s", "seconds", "stage seconds"))
+    for result in results:
+        stages = " ".join("{}={:.3f}".format(stage, seconds) for stage, seconds in result["stage_seconds"].items())
+        output.write("{:<34} {:>12.0f} {:>8.3f}  {}\n".format(result["scenario"], result["records_per_second"],
+                                                             result["seconds"], stages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run synthetic Singer streams through persist_lines")
+    add_generator_arguments(parser)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run, can be repeated (default all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario, the fastest one is kept')
+    parser.add_argument('--base-dir', help='Directory of the output files (a memory file system shows the cost of '
+                                           'the target instead of the disk)')
+    parser.add_argument('--record-validation', help='record_validation mode of the runs')
+    parser.add_argument('--output', help='JSON file where the results are written (default stdout)')
+    args = parser.parse_args()
+    # the runs log every stream and file, only the results are shown
+    logging.getLogger().setLevel(logging.WARNING)
+
+    generator = generator_arguments(args)
+    lines = generate_lines(**generator)
+    options = {"record_validation": args.record_validation} if args.record_validation else None
+    results = [run_scenario(scenario, lines, args.streams, args.repeat, args.base_dir, options)
+               for scenario in args.scenario or list(SCENARIOS)]
+    print_results(results)
+    report = dict(get_environment(), generator=generator, repeat=args.repeat, results=results)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == '__main__':
+    main()
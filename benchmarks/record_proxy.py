@@ -0,0 +1,30 @@
+import timeit
+
+from target_mako.dict_proxy import lazy_namespace, wrap_namespace
+
+RECORD_WIDTH = 500
+REPEAT = 2000
+
+
+def build_record(width):
+    record = {"id": 1, "name": "Ward", "dimensions": {"width": 10, "height": 20}}
+    for i in range(width):
+        record["field_" + str(i)] = {"value": "some value", "code": i, "items": [{"key": i}, {"key": i + 1}]}
+    return record
+
+
+def read_three_fields(record_values):
+    return record_values.id, record_values.name, record_values.dimensions.height
+
+
+def main():
+    record = build_record(RECORD_WIDTH)
+    eager = timeit.timeit(lambda: read_three_fields(wrap_namespace(record)), number=REPEAT)
+    lazy = timeit.timeit(lambda: read_three_fields(lazy_namespace(record)), number=REPEAT)
+    print("record width: {}, template reads 3 fields".format(RECORD_WIDTH))
+    print("wrap_namespace: {:.1f} us/record".format(eager / REPEAT * 1e6))
+    print("lazy_namespace: {:.1f} us/record".format(lazy / REPEAT * 1e6))
+
+
+if __name__ == '__main__':
+    main()
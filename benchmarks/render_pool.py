@@ -0,0 +1,58 @@
+import json
+import tempfile
+import time
+
+from target_mako import persist_lines
+
+RECORD_COUNT = 20000
+
+
+def build_lines():
+    lines = [json.dumps({"type": "SCHEMA", "stream": "hot-stream", "key_properties": ["id"],
+                         "schema": {"type": "object", "properties": {"id": {"type": "integer"}}}})]
+    for index in range(RECORD_COUNT):
+        lines.append(json.dumps({"type": "RECORD", "stream": "hot-stream",
+                                 "record": {"id": index, "name": "Ward", "checked": index % 2 == 0, "hour": "11:05",
+                                            "dimensions": {"width": index, "height": 20}, "color": "red",
+                                            "price": 12.5, "tags": ["giuWZuYElGsAQRrAVkwoPhEkmGYAEW", "KxRwOKWS"]}}))
+    return lines
+
+
+def run(output_dir, render_processes):
+    config = {
+        "template_dir": "templates",
+        "cache_template_dir": tempfile.gettempdir() + "/mako_modules",
+        "output_dir": output_dir,
+        "missing_attribute_report": "off",
+        "template_list": [
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "",
+                "output_file_name": "sample.csv"
+            },
+            {
+                "header_template_name": "json/sample_header.template.json",
+                "data_template_name": "json/sample.template.json",
+                "footer_template_name": "json/sample_footer.template.json",
+                "output_file_name": "sample.json"
+            }
+        ]
+    }
+    if render_processes:
+        config["render_processes"] = render_processes
+    lines = build_lines()
+    start = time.perf_counter()
+    persist_lines(config, lines)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as output_dir:
+        for render_processes in [None, 1, 2, 4]:
+            elapsed = run(output_dir, render_processes)
+            print("render_processes {:>4}: {:.0f} records/s".format(str(render_processes), RECORD_COUNT / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import io
+import json
+import time
+
+from target_mako import persist_lines
+from target_mako.json_parser import AUTO_JSON_PARSERS, load_json_parser
+
+
+def read_recorded_lines(recorded_stream):
+    with open(recorded_stream, "rb") as input_file:
+        return input_file.readlines()
+
+
+def time_parse(lines, json_loads, decode):
+    start = time.perf_counter()
+    if decode:
+        # previous input path: utf-8 decoding by a text wrapper then parsing of the str line
+        lines = io.TextIOWrapper(io.BytesIO(b''.join(lines)), encoding='utf-8')
+    for line in lines:
+        json_loads(line)
+    return time.perf_counter() - start
+
+
+def time_persist_lines(config, lines):
+    start = time.perf_counter()
+    persist_lines(config, iter(lines))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Singer stream with each available JSON parser")
+    parser.add_argument('recorded_stream', help='File containing the Singer messages, one per line')
+    parser.add_argument('-c', '--config', help='Target config file, when set the whole target is also run')
+    args = parser.parse_args()
+
+    lines = read_recorded_lines(args.recorded_stream)
+    config = None
+    if args.config:
+        with open(args.config) as input_args:
+            config = json.load(input_args)
+    for json_parser in ('json',) + AUTO_JSON_PARSERS:
+        try:
+            _, json_loads = load_json_parser(json_parser)
+        except Exception:
+            print("{:<9} not installed".format(json_parser))
+            continue
+        text_time = time_parse(lines, json_loads, True)
+        bytes_time = time_parse(lines, json_loads, False)
+        print("{:<9} parse str lines: {:>9.0f} lines/s  parse bytes lines: {:>9.0f} lines/s"
+              .format(json_parser, len(lines) / text_time, len(lines) / bytes_time))
+        if config is not None:
+            persist_time = time_persist_lines(dict(config, json_parser=json_parser), lines)
+            print("{:<9} persist_lines: {:>9.0f} lines/s".format(json_parser, len(lines) / persist_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import time
+
+from target_mako import get_wrapped_schema
+from target_mako.dict_proxy import wrap_namespace
+
+STREAM = "bench-stream"
+RECORD_COUNT = 2000
+SCHEMA_WIDTH = 300
+
+
+def build_schema(width):
+    properties = {
+        "id": {"type": "integer"},
+        "name": {"type": "string"},
+        "checked": {"type": "boolean"},
+        "hour": {"type": "string"},
+        "color": {"type": "string"},
+        "price": {"type": "number"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "dimensions": {"type": "object", "properties": {"width": {"type": "integer"},
+                                                        "height": {"type": "integer"}}},
+    }
+    for i in range(width):
+        properties["field_" + str(i)] = {"type": ["null", "object"],
+                                         "properties": {"value": {"type": ["null", "string"]},
+                                                        "code": {"type": ["null", "integer"]}}}
+    return {"type": "object", "properties": properties}
+
+
+def build_record(index):
+    return {"type": "RECORD", "stream": STREAM,
+            "record": {"id": index, "name": "Ward", "checked": False, "hour": "11:05:30 PM", "color": "red",
+                       "price": -6013876.97, "tags": ["a", "b", "c"], "dimensions": {"width": 10, "height": 20}}}
+
+
+def time_per_record(wrap_schema):
+    start = time.perf_counter()
+    for _ in range(RECORD_COUNT):
+        wrap_schema()
+    return (time.perf_counter() - start) / RECORD_COUNT
+
+
+def main():
+    schema = build_schema(SCHEMA_WIDTH)
+    wrapped_schemas = {}
+    # before the cache, the schema was copied by wrap_namespace for every record
+    copied = time_per_record(lambda: wrap_namespace(schema))
+    # a lazy proxy is cheap to build, the cache still saves it
+    lazy = time_per_record(lambda: get_wrapped_schema(None, STREAM, schema))
+    cached = time_per_record(lambda: get_wrapped_schema(wrapped_schemas, STREAM, schema))
+    print("schema width: {}, records: {}".format(SCHEMA_WIDTH, RECORD_COUNT))
+    print("wrap_namespace per record: {:.2f} us/record".format(copied * 1e6))
+    print("lazy_namespace per record: {:.2f} us/record".format(lazy * 1e6))
+    print("schema cache:              {:.2f} us/record".format(cached * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import json
+import random
+import sys
+
+# fields read by the sample templates of the templates directory
+SAMPLE_PROPERTIES = {
+    "id": {"type": "integer"},
+    "name": {"type": ["null", "string"]},
+    "checked": {"type": ["null", "boolean"]},
+    "hour": {"type": ["null", "string"]},
+    "color": {"type": ["null", "string"]},
+    "price": {"type": ["null", "number"]},
+    "tags": {"type": "array", "items": {"type": "string"}},
+    "dimensions": {"type": ["null", "object"], "properties": {"width": {"type": ["null", "integer"]},
+                                                              "height": {"type": ["null", "integer"]}}}
+}
+COLORS = ["red", "green", "blue", "black", "white"]
+TAGS = ["Light", "Heavy", "Blue", "Fragile", "New"]
+
+
+def build_nested_schema(depth):
+    # an object with a value and a code, holding the next level until depth is reached
+    properties = {"value": {"type": ["null", "string"]}, "code": {"type": ["null", "integer"]}}
+    if depth > 1:
+        properties["child"] = build_nested_schema(depth - 1)
+    return {"type": ["null", "object"], "properties": properties}
+
+
+def build_schema(schema_width=0, nesting_depth=1):
+    """
+    Schema of the sample templates fields, plus "schema_width" extra fields "field_<n>" nested "nesting_depth" times.
+    """
+    properties = dict(SAMPLE_PROPERTIES)
+    for index in range(schema_width):
+        properties["field_" + str(index)] = build_nested_schema(nesting_depth)
+    return {"type": "object", "properties": properties}
+
+
+def build_nested_value(rand, index, depth, null_ratio):
+    if rand.random() < null_ratio:
+        return None
+    value = {"value": "value {}".format(index), "code": index}
+    if depth > 1:
+        value["child"] = build_nested_value(rand, index, depth - 1, null_ratio)
+    return value
+
+
+def build_record(rand, index, schema_width=0, nesting_depth=1, null_ratio=0.0):
+    record = {
+        "id": index,
+        "name": "Ward {}".format(index),
+        "checked": index % 2 == 0,
+        "hour": "{:02d}:{:02d}:30 PM".format(index % 12 + 1, index % 60),
+        "color": COLORS[index % len(COLORS)],
+        "price": round(rand.uniform(-10000, 10000), 2),
+        "tags": rand.sample(TAGS, index % 4),
+        "dimensions": {"width": index % 100, "height": index % 50}
+    }
+    if null_ratio:
+        for key in record:
+            # the sample templates loop over the tags, they are never null
+            if key not in ("id", "tags") and rand.random() < null_ratio:
+                record[key] = None
+    for field_index in range(schema_width):
+        record["field_" + str(field_index)] = build_nested_value(rand, field_index, nesting_depth, null_ratio)
+    return record
+
+
+def generate_messages(record_count, schema_width=0, nesting_depth=1, null_ratio=0.0, streams=1, interleave=1,
+                      state_every=None, seed=0):
+    """
+    Yield the Singer messages of a synthetic run: one SCHEMA per stream, then "record_count" RECORD messages per
+    stream. The streams take turns every "interleave" records. A STATE is sent every "state_every" records and at
+    the end. The same arguments always give the same messages.
+    """
+    rand = random.Random(seed)
+    schema = build_schema(schema_width, nesting_depth)
+    stream_names = ["stream_{}".format(index) for index in range(streams)]
+    for stream in stream_names:
+        yield {"type": "SCHEMA", "stream": stream, "schema": schema, "key_properties": ["id"]}
+    sent = 0
+    for first_index in range(0, record_count, interleave):
+        for stream in stream_names:
+            for index in range(first_index, min(first_index + interleave, record_count)):
+                yield {"type": "RECORD", "stream": stream,
+                       "record": build_record(rand, index, schema_width, nesting_depth, null_ratio)}
+                sent += 1
+                if state_every and sent % state_every == 0:
+                    yield {"type": "STATE", "stream": stream, "value": {"records": sent}}
+    yield {"type": "STATE", "stream": stream_names[-1], "value": {"records": sent}}
+
+
+def generate_lines(*args, **kwargs):
+    # the input lines of the target, as read from stdin
+    return [json.dumps(message) for message in generate_messages(*args, **kwargs)]
+
+
+def add_generator_arguments(parser):
+    parser.add_argument('--records', type=int, default=10000, help='Number of records per stream')
+    parser.add_argument('--schema-width', type=int, default=0, help='Number of extra fields per record')
+    parser.add_argument('--nesting-depth', type=int, default=1, help='Depth of the extra fields objects')
+    parser.add_argument('--null-ratio', type=float, default=0.0, help='Ratio of null values')
+    parser.add_argument('--streams', type=int, default=1, help='Number of streams')
+    parser.add_argument('--interleave', type=int, default=1, help='Records of a stream before the next stream')
+    parser.add_argument('--state-every', type=int, default=None, help='Records between two STATE messages')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+
+def generator_arguments(args):
+    return {"record_count": args.records, "schema_width": args.schema_width, "nesting_depth": args.nesting_depth,
+            "null_ratio": args.null_ratio, "streams": args.streams, "interleave": args.interleave,
+            "state_every": args.state_every, "seed": args.seed}
+
+
+def main():
+    # the generated stream can be saved and replayed, see benchmarks.replay_stream
+    parser = argparse.ArgumentParser(description="Write a synthetic Singer stream on stdout")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    for message in generate_messages(**generator_arguments(args)):
+        sys.stdout.write(json.dumps(message) + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+import time
+
+from benchmarks.schema_cache import build_record, build_schema
+from target_mako.validation import RECORD_VALIDATION_MODES, RecordValidator
+
+RECORD_COUNT = 5000
+SCHEMA_WIDTH = 300
+
+
+def run(mode, schema, records):
+    validator = RecordValidator("bench-stream", schema, mode)
+    start = time.perf_counter()
+    for record in records:
+        validator.validate(record)
+    return time.perf_counter() - start, validator.mode
+
+
+def main():
+    schema = build_schema(SCHEMA_WIDTH)
+    records = [build_record(i)["record"] for i in range(RECORD_COUNT)]
+    print("schema width: {}, records: {}".format(SCHEMA_WIDTH, RECORD_COUNT))
+    for mode in RECORD_VALIDATION_MODES:
+        elapsed, used_mode = run(mode, schema, records)
+        print("{:<9} ({:<8}): {:.1f} us/record".format(mode, used_mode, elapsed / RECORD_COUNT * 1e6))
+
+
+if __name__ == '__main__':
+    main()
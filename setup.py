@@ -40,7 +40,7 @@ setup(
     [console_scripts]
     target-mako=target_mako:main
     """,
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     package_data={
         "sample-config": ["sample_config.json"]
     },
@@ -1,25 +1,33 @@
 #!/usr/bin/env python3
 
 import argparse
-import http.client
-import io
 import json
-import os
-import string
 import sys
 import threading
-import urllib
-
-import pkg_resources
-import singer
-from jsonschema.validators import Draft4Validator
-from mako import exceptions
-from mako.lookup import TemplateLookup
-
-from target_mako.dict_proxy import wrap_namespace
-from target_mako.formatting_functions import create_rendering_functions
-
-LOGGER = singer.get_logger()
+import time
+
+from target_mako.checkpoint import create_state_checkpoint
+from target_mako.batch_output import BatchOutputFile, is_batch
+from target_mako.columnar_output import TEMPLATE_TYPES, ColumnarOutputFile, is_columnar
+from target_mako.compression import check_output_compression
+from target_mako.dict_proxy import get_missing_attribute_report, lazy_namespace, set_missing_attribute_report
+from target_mako.formatting_functions import DEFAULT_DATE_FORMAT_CACHE_SIZE, configure_date_format_cache, \
+    create_rendering_functions
+from target_mako.json_parser import load_json_parser
+from target_mako.logger import get_logger
+from target_mako.metrics import DEFAULT_METRICS_INTERVAL_SECONDS, get_metrics, set_metrics, timed_json_loads
+from target_mako.output_files import OutputFilePattern, get_abs_path, load_config_for_stream, open_output_file, \
+    render_footer_and_close, render_template
+from target_mako.output_writer import create_output_write_pool, create_rename_batch, create_written_files, \
+    forget_output_directories
+from target_mako.partitioned_output import PartitionedOutputFiles
+from target_mako.render_pool import RecordRenderPool
+from target_mako.rotated_output import RotatedOutputFile
+from target_mako.stream_workers import FLUSH_OUTPUTS, persist_messages_in_stream_workers
+from target_mako.template_cache import get_template_cache
+from target_mako.validation import RecordValidator
+
+LOGGER = get_logger()
 
 
 def emit_state(state):
@@ -30,22 +38,6 @@ def emit_state(state):
         sys.stdout.flush()
 
 
-def get_abs_path(path):
-    path_os = path.replace("/", os.path.sep)
-    pathname = os.path.join(os.getcwd(), path_os)
-    return pathname
-
-
-def load_config_for_stream(config, key, stream_id):
-    value = None
-    if key in config:
-        value = config[key]
-    if "stream_configs" in config and stream_id in config["stream_configs"] \
-            and key in config["stream_configs"][stream_id]:
-        value = config["stream_configs"][stream_id][key]
-    return value
-
-
 class TemplateValues:
     def __init__(self, d):
         for k, v in d.items():
@@ -63,6 +55,54 @@ class TemplateValues:
 
 
 def persist_lines(config, lines):
+    missing_attribute_report = set_missing_attribute_report(config.get('missing_attribute_report', 'aggregate'))
+    # output directories may have been removed since a previous run in the same process
+    forget_output_directories()
+    date_format_cache = configure_date_format_cache(config.get('date_format_cache_size',
+                                                               DEFAULT_DATE_FORMAT_CACHE_SIZE))
+    # Loop over lines from stdin
+    LOGGER.info("Processing records")
+    json_parser, json_loads = load_json_parser(config.get('json_parser', 'auto'))
+    LOGGER.info("Parsing lines with " + json_parser)
+    metrics = set_metrics(config.get('metrics', False),
+                          config.get('metrics_interval_seconds', DEFAULT_METRICS_INTERVAL_SECONDS))
+    if metrics.enabled:
+        json_loads = timed_json_loads(metrics, json_loads)
+    if config.get('stream_workers'):
+        # each stream is rendered by its own worker, this loop only parses and routes the messages
+        state = persist_messages_in_stream_workers(config, parse_lines(lines, json_loads), persist_messages)
+    else:
+        state = persist_messages(config, parse_lines(lines, json_loads))
+    missing_attribute_report.emit_summary(config.get('missing_attribute_report_file'))
+    get_template_cache().log_stats()
+    date_format_cache.log_stats()
+    metrics.emit_summary(config.get('metrics_file'))
+    return state
+
+
+def parse_lines(lines, json_loads=json.loads):
+    # lines can be str or bytes (read from sys.stdin.buffer without decoding)
+    for line in lines:
+        try:
+            o = json_loads(line)
+        except ValueError:
+            LOGGER.error("Unable to parse:\n{}".format(decode_line(line)))
+            raise
+
+        if 'type' not in o:
+            raise Exception("Line is missing required key 'type': {}".format(decode_line(line)))
+        if 'stream' not in o:
+            raise Exception("Line is missing required key 'stream': {}".format(decode_line(line)))
+        yield o
+
+
+def decode_line(line):
+    if isinstance(line, bytes):
+        return line.decode('utf-8', errors='replace')
+    return line
+
+
+def persist_messages(config, messages, flushed=None):
     state = None
     schemas = {}
     key_properties = {}
@@ -74,63 +114,141 @@ def persist_lines(config, lines):
     numbers = {}
     last_records = {}
     last_schemas = {}
+    wrapped_schemas = {}
+    render_pools = {}
+    state_checkpoint = create_state_checkpoint(config)
+    write_pool = create_output_write_pool(config)
+    rename_batch = create_rename_batch(config)
+    written_files = create_written_files(config)
 
-    # Loop over lines from stdin
-    LOGGER.info("Processing records")
     rendering_functions = create_rendering_functions()
-    for line in lines:
-        try:
-            o = json.loads(line)
-        except json.decoder.JSONDecodeError:
-            LOGGER.error("Unable to parse:\n{}".format(line))
-            raise
-
-        if 'type' not in o:
-            raise Exception("Line is missing required key 'type': {}".format(line))
-        t = o['type']
-        if 'stream' not in o:
-            raise Exception("Line is missing required key 'stream': {}".format(line))
-        stream = o['stream']
-
-        if t == 'RECORD':
-            if stream not in indexes:
-                indexes[stream] = 0
-            if stream not in numbers:
-                numbers[stream] = 1
-            line_index = indexes[stream]
-            line_number = numbers[stream]
-            record_values, schema_values, line_index, line_number = process_record(config, line_index, line_number, o,
-                                                                                   outputs, schemas, templates,
-                                                                                   validators, rendering_functions)
-            # update current data
-            indexes[stream] = line_index
-            numbers[stream] = line_number
-            last_records[stream] = record_values
-            last_schemas[stream] = schema_values
-            state = None
-        elif t == 'STATE':
-            LOGGER.debug('Setting state to {}'.format(o['value']))
-            state = o['value']
-        elif t == 'SCHEMA':
-            LOGGER.info("Rendering stream : " + stream)
-            schemas[stream] = o['schema']
-            validators[stream] = Draft4Validator(o['schema'])
-            if 'key_properties' not in o:
-                raise Exception("key_properties field is required")
-            key_properties[stream] = o['key_properties']
-            # get Mako templates
-            templates[stream] = load_template_list_from_config(config, stream)
-            # Open the output file
-            outputs[stream] = open_output_file_list(config, templates[stream], stream)
-        else:
-            raise Exception("Unknown message type {} in message {}"
-                            .format(o['type'], o))
+    try:
+        for o in messages:
+            t = o['type']
+            stream = o['stream']
+
+            if t == 'RECORD':
+                if stream not in indexes:
+                    indexes[stream] = 0
+                if stream not in numbers:
+                    numbers[stream] = 1
+                line_index = indexes[stream]
+                line_number = numbers[stream]
+                if stream in render_pools:
+                    record_values, schema_values, line_index, line_number = submit_record(line_index, line_number,
+                                                                                          o, schemas, render_pools,
+                                                                                          wrapped_schemas)
+                else:
+                    record_values, schema_values, line_index, line_number = process_record(config, line_index,
+                                                                                           line_number, o, outputs,
+                                                                                           schemas, templates,
+                                                                                           validators,
+                                                                                           rendering_functions,
+                                                                                           wrapped_schemas)
+                # update current data
+                indexes[stream] = line_index
+                numbers[stream] = line_number
+                last_records[stream] = record_values
+                last_schemas[stream] = schema_values
+                state = None
+                if state_checkpoint is not None:
+                    state_checkpoint.records += 1
+            elif t == 'STATE':
+                LOGGER.debug('Setting state to {}'.format(o['value']))
+                state = o['value']
+                if state_checkpoint is not None and state_checkpoint.is_due():
+                    # all the records received before the state must be written first
+                    flush_output_files(config, outputs, templates, render_pools, write_pool, rename_batch,
+                                       written_files)
+                    emit_state(state)
+                    state_checkpoint.emitted()
+            elif t == FLUSH_OUTPUTS:
+                # sent by the main loop before it emits a state (stream workers)
+                flush_ok = False
+                try:
+                    flush_output_files(config, outputs, templates, render_pools, write_pool, rename_batch,
+                                       written_files)
+                    flush_ok = True
+                finally:
+                    # the main loop waits for the answer, even when the flush fails
+                    if flushed is not None:
+                        flushed(flush_ok)
+            elif t == 'SCHEMA':
+                LOGGER.info("Rendering stream : " + stream)
+                if stream in render_pools:
+                    # write the records received with the previous schema
+                    render_pools[stream].flush()
+                schemas[stream] = o['schema']
+                # the schema only changes with a SCHEMA message, wrap it once for all the stream records
+                wrapped_schemas[stream] = lazy_namespace(o['schema'], 'schema')
+                validators[stream] = load_record_validator(config, stream, o['schema'])
+                if 'key_properties' not in o:
+                    raise Exception("key_properties field is required")
+                key_properties[stream] = o['key_properties']
+                # get Mako templates
+                templates[stream] = load_template_list_from_config(config, stream)
+                for template in templates[stream]:
+                    template['output_write_pool'] = write_pool
+                    template['atomic_rename_batch'] = rename_batch
+                    template['written_files'] = written_files
+                # Open the output file
+                outputs[stream] = open_output_file_list(config, templates[stream], stream)
+                render_processes = load_config_for_stream(config, 'render_processes', stream)
+                if render_processes:
+                    if stream not in render_pools:
+                        render_chunk_size = load_config_for_stream(config, 'render_chunk_size', stream) or 1000
+                        render_pools[stream] = RecordRenderPool(config, stream, render_processes, render_chunk_size)
+                    render_pools[stream].set_output(o['schema'], templates[stream], outputs[stream])
+            else:
+                raise Exception("Unknown message type {} in message {}"
+                                .format(o['type'], o))
+        for render_pool in render_pools.values():
+            render_pool.flush()
+        if write_pool is not None:
+            # the run fails if a file could not be written
+            write_pool.wait()
+    finally:
+        for render_pool in render_pools.values():
+            render_pool.close()
+        if write_pool is not None:
+            write_pool.close()
 
     # finally render the footer and close the files
     render_footers_and_close_output_files(outputs, last_records, last_schemas, templates, rendering_functions)
+    if rename_batch is not None:
+        rename_batch.commit()
     return state
 
 
+def flush_output_files(config, outputs, templates, render_pools, write_pool=None, rename_batch=None,
+                       written_files=None):
+    for render_pool in render_pools.values():
+        render_pool.flush()
+    if write_pool is not None:
+        write_pool.wait()
+    for stream in outputs:
+        output_file_list = outputs[stream]
+        for template in templates[stream]:
+            if template['one_file_per_record']:
+                continue
+            output_file = output_file_list[template['output_filename']]
+            if output_file.closed:
+                continue
+            output_file.flush()
+    if written_files is not None:
+        # "fsync_output": the files opened since the last state are synced, the closed and the open ones
+        written_files.sync()
+    if rename_batch is not None:
+        # the complete files waiting for the next batch are renamed now
+        rename_batch.commit()
+
+
+def load_record_validator(config, stream, schema):
+    record_validation = load_config_for_stream(config, 'record_validation', stream) or 'full'
+    sample_rate = load_config_for_stream(config, 'record_validation_sample_rate', stream) or 100
+    return RecordValidator(stream, schema, record_validation, sample_rate)
+
+
 def load_template_from_config(config, template_lookup, template_list):
     header_template_name = config['header_template_name']
     header_template = None
@@ -148,18 +266,40 @@ def load_template_from_config(config, template_lookup, template_list):
     one_file_per_record = False
     if "one_file_per_record" in config:
         one_file_per_record = config['one_file_per_record']
-    template_list.append({"header": header_template, "line": line_template, "footer": footer_template,
-                          "output_filename": output_file_name, "one_file_per_record": one_file_per_record})
+    templates = {"header": header_template, "line": line_template, "footer": footer_template,
+                 "output_filename": output_file_name, "one_file_per_record": one_file_per_record}
+    if config.get('output_compression'):
+        check_output_compression(config['output_compression'])
+    if config.get('template_type', 'mako') not in TEMPLATE_TYPES:
+        raise Exception("Unknown template_type {}, expected one of {}".format(config['template_type'],
+                                                                            TEMPLATE_TYPES))
+    # optional output settings
+    for key in ["output_file_encoding", "output_file_EOL", "output_buffer_size", "partition_output_files",
+                "max_open_files", "max_records_per_file", "max_bytes_per_file", "output_compression",
+                "output_compression_level", "output_compression_threads", "template_type", "columns",
+                "column_separator", "columnar_chunk_size", "records_per_render"]:
+        if key in config:
+            templates[key] = config[key]
+    template_list.append(templates)
     return template_list
 
 
+def opens_files_per_record(templates):
+    # partitioned and rotated templates choose their output file when a record is received
+    return templates.get('partition_output_files') or templates.get('max_records_per_file') \
+        or templates.get('max_bytes_per_file')
+
+
+def renders_records(templates):
+    # these templates are written by their output object, see render_record
+    return opens_files_per_record(templates) or is_columnar(templates) or is_batch(templates)
+
+
 def load_template_list_from_config(config, stream):
     LOGGER.info("Loading templates for stream : " + stream)
     template_dir = load_config_for_stream(config, 'template_dir', stream)
-    # preprocessor is there to remove extra line inside generated content (On windows machines).
-    template_lookup = TemplateLookup(directories=[get_abs_path(template_dir)],
-                                     module_directory=config['cache_template_dir'],
-                                     preprocessor=[lambda x: x.replace("\r\n", "\n")])
+    # lookups and loaded templates are shared by the streams and the SCHEMA messages using the same directories
+    template_lookup = get_template_cache().get_lookup(get_abs_path(template_dir), config['cache_template_dir'])
     template_config_list = load_config_for_stream(config, 'template_list', stream)
     template_list = []
     for template_config in template_config_list:
@@ -167,30 +307,69 @@ def load_template_list_from_config(config, stream):
     return template_list
 
 
+def precompile_templates(config):
+    # default configuration first, then the stream specific ones
+    streams = [None] + list(config.get('stream_configs', {}))
+    compile_times = []
+    for stream in streams:
+        template_dir = load_config_for_stream(config, 'template_dir', stream)
+        template_config_list = load_config_for_stream(config, 'template_list', stream)
+        if not template_dir or not template_config_list:
+            continue
+        template_lookup = get_template_cache().get_lookup(get_abs_path(template_dir), config['cache_template_dir'])
+        for template_config in template_config_list:
+            for key in ['header_template_name', 'data_template_name', 'footer_template_name']:
+                template_name = template_config.get(key)
+                if not template_name or template_name in template_lookup.templates:
+                    continue
+                start = time.perf_counter()
+                template_lookup.get_template(template_name)
+                compile_time = time.perf_counter() - start
+                LOGGER.info("Compiled template {} in {:.1f} ms".format(template_name, compile_time * 1000))
+                compile_times.append((template_dir, template_name, compile_time))
+    LOGGER.info("Precompiled {} templates into {}".format(len(compile_times), config['cache_template_dir']))
+    return compile_times
+
+
 def open_output_file_list(config, template_list, stream):
     LOGGER.info("Initializing output files for stream : " + stream)
     output_file_list = {}
     output_dir = load_config_for_stream(config, 'output_dir', stream)
     for templates in template_list:
         one_file_per_record = templates['one_file_per_record']
-        if not one_file_per_record:
-            output_file_encoding = "utf8"
-            if "output_file_encoding" in templates:
-                output_file_encoding = templates['output_file_encoding']
-            output_file_EOL = "\r\n"
-            if "output_file_EOL" in templates:
-                output_file_EOL = templates['output_file_EOL']
+        if is_columnar(templates):
+            if one_file_per_record or opens_files_per_record(templates):
+                raise Exception("one_file_per_record, partition_output_files, max_records_per_file and "
+                                "max_bytes_per_file are not supported with template_type columnar, file : "
+                                + templates['output_filename'])
+            # the records are rendered by chunks of columns
+            output_file_list[templates['output_filename']] = ColumnarOutputFile(config, templates, stream)
+        elif is_batch(templates):
+            if one_file_per_record or opens_files_per_record(templates):
+                raise Exception("one_file_per_record, partition_output_files, max_records_per_file and "
+                                "max_bytes_per_file are not supported with records_per_render, file : "
+                                + templates['output_filename'])
+            # the records are rendered by chunks with one template call
+            output_file_list[templates['output_filename']] = BatchOutputFile(config, templates, stream)
+        elif templates.get('partition_output_files'):
+            if one_file_per_record or templates.get('max_records_per_file') or templates.get('max_bytes_per_file'):
+                raise Exception("one_file_per_record, max_records_per_file and max_bytes_per_file are not supported "
+                                "with partition_output_files, file : " + templates['output_filename'])
+            # the files are opened when the records are received
+            output_file_list[templates['output_filename']] = PartitionedOutputFiles(config, templates, stream)
+        elif opens_files_per_record(templates):
+            # the parts are opened when the records are received
+            output_file_list[templates['output_filename']] = RotatedOutputFile(config, templates, stream)
+        elif not one_file_per_record:
             output_filename = templates['output_filename']
             output_file_path = get_abs_path(output_dir) + '/' + output_filename
-            directory = os.path.dirname(output_file_path)
-            os.makedirs(directory, exist_ok=True)
-            output_file = open(output_file_path, "w+", encoding=output_file_encoding, newline=output_file_EOL)
+            output_file = open_output_file(config, output_file_path, templates, stream)
             output_file_list[output_filename] = output_file
     return output_file_list
 
 
 def process_record(config, line_index, line_number, o, outputs, schemas, templates,
-                   validators, rendering_functions):
+                   validators, rendering_functions, wrapped_schemas=None):
     stream = o['stream']
     if stream not in schemas:
         raise Exception(
@@ -199,15 +378,28 @@ def process_record(config, line_index, line_number, o, outputs, schemas, templat
     template_list = templates[stream]
     # Get schema for this record's stream
     schema = schemas[stream]
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics.set_stream(stream)
+        start = time.perf_counter()
     # Validate record
     validators[stream].validate(o['record'])
+    if metrics.enabled:
+        validated = time.perf_counter()
     record_dict = o['record']
     # enrich record with processing specific values
     record_dict['record_index'] = line_index
     record_dict['record_number'] = line_number
-    record_values = wrap_namespace(record_dict)
-    schema_values = wrap_namespace(schema)
+    record_values = lazy_namespace(record_dict, 'record')
+    schema_values = get_wrapped_schema(wrapped_schemas, stream, schema)
+    if metrics.enabled:
+        metrics.add_record(stream, validated - start, time.perf_counter() - validated)
+    get_missing_attribute_report().set_stream(stream)
     for templates in template_list:
+        if renders_records(templates):
+            output_file_list[templates['output_filename']].render_record(record_dict, record_values, schema_values,
+                                                                         rendering_functions)
+            continue
         one_file_per_record = templates['one_file_per_record']
         output_file = get_or_open_file_for_template(config, one_file_per_record, output_file_list, record_dict,
                                                     templates, stream)
@@ -218,73 +410,61 @@ def process_record(config, line_index, line_number, o, outputs, schemas, templat
     return record_values, schema_values, line_index, line_number
 
 
+def submit_record(line_index, line_number, o, schemas, render_pools, wrapped_schemas):
+    stream = o['stream']
+    if stream not in schemas:
+        raise Exception(
+            "A record for stream {} was encountered before a corresponding schema".format(stream))
+    # the record is validated, enriched and rendered by the pool, then written in order
+    record_dict = o['record']
+    render_pools[stream].submit(line_index, record_dict)
+    record_values = lazy_namespace(record_dict, 'record')
+    schema_values = get_wrapped_schema(wrapped_schemas, stream, schemas[stream])
+    line_index += 1
+    line_number += 1
+    return record_values, schema_values, line_index, line_number
+
+
+def get_wrapped_schema(wrapped_schemas, stream, schema):
+    if wrapped_schemas is None:
+        return lazy_namespace(schema, 'schema')
+    if stream not in wrapped_schemas:
+        wrapped_schemas[stream] = lazy_namespace(schema, 'schema')
+    return wrapped_schemas[stream]
+
+
 def render_templates_for_record(line_index, one_file_per_record, output_file, record_values, schema_values, templates,
                                 rendering_functions):
     # if first record of the stream then generate header
     if line_index == 0 or one_file_per_record:
-        if templates['header'] is not None:
-            try:
-                output_file.write(
-                    templates['header'].render(record=record_values, schema=schema_values,
-                                               functions=rendering_functions) + "\n")
-            except AttributeError as exc:
-                LOGGER.error(str(exc))
-            except Exception:
-                LOGGER.error(exceptions.text_error_template().render())
+        render_template(output_file, templates['header'], record_values, schema_values, rendering_functions)
     # generate the line template
-    if templates['line'] is not None:
-        try:
-            output_file.write(templates['line'].render(record=record_values, schema=schema_values,
-                                                       functions=rendering_functions) + "\n")
-        except AttributeError as exc:
-            LOGGER.error(str(exc))
-        except Exception:
-            LOGGER.error(exceptions.text_error_template().render())
+    render_template(output_file, templates['line'], record_values, schema_values, rendering_functions)
     if one_file_per_record:
         # add footer
         render_footer_and_close(output_file, record_values, schema_values, templates, rendering_functions)
 
 
-def render_footer_and_close(output_file, record_values, schema_values, templates, rendering_functions):
-    if templates['footer'] is not None:
-        try:
-            output_file.write(
-                templates['footer'].render(record=record_values, schema=schema_values,
-                                           functions=rendering_functions) + "\n")
-        except AttributeError as exc:
-            LOGGER.error(str(exc))
-        except Exception:
-            LOGGER.error(exceptions.text_error_template().render())
-    # close the file
-    output_file.close()
-
-
 def get_or_open_file_for_template(config, one_file_per_record, output_file_list, record_dict, templates, stream):
     output_filename = templates['output_filename']
     if not one_file_per_record:
         # use the single file
         output_file = output_file_list[output_filename]
     else:
-        # open a new file
-        output_file_path = generate_output_file_path(config, output_filename, record_dict, stream)
-        output_file_encoding = "utf8"
-        if "output_file_encoding" in templates:
-            output_file_encoding = templates['output_file_encoding']
-        output_file_EOL = "\r\n"
-        if "output_file_EOL" in templates:
-            output_file_EOL = templates['output_file_EOL']
-        directory = os.path.dirname(output_file_path)
-        os.makedirs(directory, exist_ok=True)
-        output_file = open(output_file_path, "w+", encoding=output_file_encoding, newline=output_file_EOL)
+        # open a new file, the file name pattern is parsed once per template
+        output_file_pattern = templates.get('output_file_pattern')
+        if output_file_pattern is None:
+            output_dir = load_config_for_stream(config, 'output_dir', stream)
+            output_file_pattern = OutputFilePattern(get_abs_path(output_dir), output_filename)
+            templates['output_file_pattern'] = output_file_pattern
+        output_file_path = output_file_pattern.format(record_dict)
+        output_file = open_output_file(config, output_file_path, templates, stream)
     return output_file
 
 
 def generate_output_file_path(config, output_filename, record_dict, stream):
-    formatter = BlankFormatter()
     output_dir = load_config_for_stream(config, 'output_dir', stream)
-    final_file_name = formatter.format(output_filename, **record_dict)
-    output_file_path = get_abs_path(output_dir) + '/' + final_file_name
-    return output_file_path
+    return OutputFilePattern(get_abs_path(output_dir), output_filename).format(record_dict)
 
 
 def render_footers_and_close_output_files(outputs, last_records, last_schemas, templates,
@@ -295,17 +475,26 @@ def render_footers_and_close_output_files(outputs, last_records, last_schemas, t
         output_file_list = outputs[stream]
         record_values = last_records[stream]
         schema_values = last_schemas[stream]
+        get_missing_attribute_report().set_stream(stream)
+        get_metrics().set_stream(stream)
         for template in template_list:
             output_filename = template['output_filename']
             one_file_per_record = template['one_file_per_record']
-            if not one_file_per_record:
+            if renders_records(template):
+                output_file_list[output_filename].render_footers_and_close(rendering_functions)
+            elif not one_file_per_record:
                 output_file = output_file_list[output_filename]
                 render_footer_and_close(output_file, record_values, schema_values, template, rendering_functions)
 
 
 def send_usage_stats():
+    # imported here to keep the start of the target fast, the stats are sent by a background thread
+    import http.client
+    import urllib.parse
+    from importlib.metadata import version as distribution_version
+
     try:
-        version = pkg_resources.get_distribution('target-mako').version
+        version = distribution_version('target-mako')
         conn = http.client.HTTPConnection('collector.singer.io', timeout=10)
         conn.connect()
         params = {
@@ -325,6 +514,8 @@ def send_usage_stats():
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-c', '--config', help='Config file')
+    parser.add_argument('--precompile', action='store_true',
+                        help='Compile the configured templates into cache_template_dir and exit')
     args = parser.parse_args()
 
     if args.config:
@@ -333,14 +524,18 @@ def main():
     else:
         config = {}
 
+    if args.precompile:
+        precompile_templates(config)
+        return
+
     if not config.get('disable_collection', False):
         LOGGER.info('Sending version information to singer.io. ' +
                     'To disable sending anonymous usage data, set ' +
                     'the config parameter "disable_collection" to true')
         threading.Thread(target=send_usage_stats).start()
 
-    input_state = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
-    state = persist_lines(config, input_state)
+    # the JSON parser reads the utf-8 bytes directly
+    state = persist_lines(config, sys.stdin.buffer)
 
     emit_state(state)
     LOGGER.debug("Exiting normally")
@@ -348,14 +543,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
-
-class BlankFormatter(string.Formatter):
-    def __init__(self, default=''):
-        self.default = default
-
-    def get_value(self, key, args, kwds):
-        if isinstance(key, str):
-            return kwds.get(key, self.default)
-        else:
-            return string.Formatter.get_value(key, args, kwds)
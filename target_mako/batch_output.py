@@ -0,0 +1,104 @@
+import time
+
+from target_mako.dict_proxy import get_missing_attribute_report
+from target_mako.metrics import get_metrics
+from target_mako.output_files import get_abs_path, load_config_for_stream, log_template_error, open_output_file, \
+    render_footer_and_close, render_template
+
+
+def is_batch(templates):
+    return bool(templates.get('records_per_render'))
+
+
+#
+# Output file of a template rendering several records per Mako call: the data template receives the list
+# "records" of at most "records_per_render" records and loops over them itself, for example:
+#
+#   % for record in records:
+#   ${record.id};${record.name}
+#   % endfor
+#
+# The rendered text is written as is, the template writes the end of each line. The header and footer are rendered
+# with the first and last record, like for the other templates. When a chunk cannot be rendered, its records are
+# rendered one by one so only the records in error are missing, as with a per record template.
+#
+class BatchOutputFile(object):
+    def __init__(self, config, templates, stream):
+        self.templates = templates
+        self.stream = stream
+        self.records_per_render = templates['records_per_render']
+        output_dir = load_config_for_stream(config, 'output_dir', stream)
+        output_file_path = get_abs_path(output_dir) + '/' + templates['output_filename']
+        self.output_file = open_output_file(config, output_file_path, templates, stream)
+        self.records = []
+        self.started = False
+        self.last_values = None
+        self.rendering_functions = None
+
+    @property
+    def closed(self):
+        return self.output_file.closed
+
+    def fileno(self):
+        return self.output_file.fileno()
+
+    def render_record(self, record_dict, record_values, schema_values, rendering_functions):
+        if not self.started:
+            self.started = True
+            render_template(self.output_file, self.templates['header'], record_values, schema_values,
+                            rendering_functions)
+        self.records.append(record_values)
+        self.last_values = (record_values, schema_values)
+        self.rendering_functions = rendering_functions
+        if len(self.records) >= self.records_per_render:
+            self.write_records()
+
+    def write_records(self):
+        records = self.records
+        if not records:
+            return
+        self.records = []
+        template = self.templates['line']
+        if template is None:
+            return
+        report = get_missing_attribute_report()
+        report.set_stream(self.stream)
+        report.set_template(template.uri)
+        get_metrics().set_stream(self.stream)
+        self.render_records(template, records)
+
+    def render_records(self, template, records):
+        _, schema_values = self.last_values
+        metrics = get_metrics()
+        start = time.perf_counter()
+        try:
+            text = template.render(records=records, schema=schema_values, functions=self.rendering_functions)
+        except Exception as exc:
+            if len(records) == 1:
+                if metrics.enabled:
+                    metrics.add_render_error(template.uri)
+                log_template_error(exc)
+                return
+            for record_values in records:
+                self.render_records(template, [record_values])
+            return
+        rendered = time.perf_counter()
+        self.output_file.write(text)
+        if metrics.enabled:
+            metrics.add_render(template.uri, rendered - start, time.perf_counter() - rendered,
+                               len(text.encode('utf8', 'replace')))
+
+    def flush(self):
+        self.write_records()
+        self.output_file.flush()
+
+    def render_footers_and_close(self, rendering_functions):
+        self.write_records()
+        if self.last_values is None:
+            self.output_file.close()
+            return
+        record_values, schema_values = self.last_values
+        render_footer_and_close(self.output_file, record_values, schema_values, self.templates, rendering_functions)
+
+    def close(self):
+        self.output_file.close()
@@ -0,0 +1,33 @@
+import time
+
+
+#
+# Decides when a received STATE can be emitted during the run.
+# A state is due after "state_emit_every_records" records or "state_emit_every_seconds" seconds
+# since the last emitted state, whichever comes first.
+#
+class StateCheckpoint(object):
+    def __init__(self, every_records=None, every_seconds=None):
+        self.every_records = every_records
+        self.every_seconds = every_seconds
+        self.records = 0
+        self.last_emit_time = time.monotonic()
+
+    def is_due(self):
+        if self.every_records and self.records >= self.every_records:
+            return True
+        if self.every_seconds and time.monotonic() - self.last_emit_time >= self.every_seconds:
+            return True
+        return False
+
+    def emitted(self):
+        self.records = 0
+        self.last_emit_time = time.monotonic()
+
+
+def create_state_checkpoint(config):
+    every_records = config.get('state_emit_every_records')
+    every_seconds = config.get('state_emit_every_seconds')
+    if not every_records and not every_seconds:
+        return None
+    return StateCheckpoint(every_records, every_seconds)
@@ -0,0 +1,235 @@
+import time
+
+from target_mako.dict_proxy import get_missing_attribute_report, lazy_namespace
+from target_mako.formatting_functions import create_rendering_functions
+from target_mako.logger import get_logger
+from target_mako.metrics import get_metrics
+from target_mako.output_files import get_abs_path, load_config_for_stream, open_output_file, render_footer_and_close, \
+    render_template
+
+LOGGER = get_logger()
+
+TEMPLATE_TYPES = ('mako', 'columnar')
+
+DEFAULT_COLUMNAR_CHUNK_SIZE = 1000
+
+# the field is not in the record, or a parent field is null or missing
+_MISSING = object()
+
+
+def is_columnar(templates):
+    return templates.get('template_type') == 'columnar'
+
+
+#
+# Column functions: the rendering functions applied to a whole column of values at once.
+# They give the same text as str(function(value, *arguments)) for each value.
+#
+def lfixed_column(values, string_size):
+    return [str(value)[:string_size].ljust(string_size) for value in values]
+
+
+def rfixed_column(values, string_size):
+    return [str(value)[:string_size].rjust(string_size) for value in values]
+
+
+def nfixed_column(values, string_size):
+    return [str(value)[:string_size].rjust(string_size, "0") for value in values]
+
+
+def lower_column(values):
+    return [str(value).lower() for value in values]
+
+
+def upper_column(values):
+    return [str(value).upper() for value in values]
+
+
+COLUMN_FUNCTIONS = {
+    'lfixed': lfixed_column,
+    'rfixed': rfixed_column,
+    'nfixed': nfixed_column,
+    'lower': lower_column,
+    'upper': upper_column
+}
+
+
+#
+# A column of a "columnar" template: a record field (dotted path for nested objects), with an optional rendering
+# function called with the field value and its "width" or "arguments".
+#
+class Column(object):
+    def __init__(self, column_config, rendering_functions):
+        if 'field' not in column_config:
+            raise Exception("Column without field: {}".format(column_config))
+        self.path = column_config['field']
+        self.keys = self.path.split('.')
+        self.function_name = column_config.get('function')
+        if 'width' in column_config:
+            self.arguments = [column_config['width']]
+        else:
+            self.arguments = list(column_config.get('arguments', []))
+        self.function = None
+        if self.function_name is not None:
+            if self.function_name not in rendering_functions:
+                raise Exception("Unknown function {} for column {}, expected one of {}"
+                                .format(self.function_name, self.path, sorted(rendering_functions)))
+            self.function = rendering_functions[self.function_name]
+
+    def get_values(self, records, invalid_rows):
+        keys = self.keys
+        if len(keys) == 1:
+            key = keys[0]
+            values = [record.get(key, _MISSING) for record in records]
+        else:
+            values = [get_nested_value(record, keys) for record in records]
+        for row, value in enumerate(values):
+            if value is None or value is _MISSING or value.__class__ in (dict, list, InvalidPath):
+                values[row] = self.check_value(row, records[row], invalid_rows)
+        return values
+
+    def check_value(self, row, record, invalid_rows):
+        # same value and report as reading the field from a Mako template
+        report = get_missing_attribute_report()
+        value = record
+        path = 'record'
+        for key in self.keys:
+            if not isinstance(value, dict):
+                invalid_rows[row] = "'{}' object has no attribute '{}'".format(
+                    lazy_namespace(value).__class__.__name__, key)
+                return ''
+            path += '.' + key
+            if key not in value:
+                report.missing(path)
+                return ''
+            value = value[key]
+            if value is None:
+                report.null(path)
+                return ''
+        return lazy_namespace(value)
+
+    def format_values(self, values, invalid_rows):
+        if self.function is None:
+            return [value if value.__class__ is str else str(value) for value in values]
+        column_function = COLUMN_FUNCTIONS.get(self.function_name)
+        if column_function is not None:
+            return column_function(values, *self.arguments)
+        try:
+            return [str(self.function(value, *self.arguments)) for value in values]
+        except Exception:
+            # the values are formatted one by one to find the rows in error
+            return [self.format_value(row, value, invalid_rows) for row, value in enumerate(values)]
+
+    def format_value(self, row, value, invalid_rows):
+        try:
+            return str(self.function(value, *self.arguments))
+        except Exception as exc:
+            invalid_rows[row] = "{} for column {}: {}".format(self.function_name, self.path, exc)
+            return ''
+
+
+class InvalidPath(object):
+    # a parent of the field is not an object, only known once the record is checked by Column.check_value
+    pass
+
+
+_INVALID_PATH = InvalidPath()
+
+
+def get_nested_value(record, keys):
+    value = record
+    for key in keys:
+        if value.__class__ is not dict:
+            if value is None or value is _MISSING:
+                return _MISSING
+            return _INVALID_PATH
+        value = value.get(key, _MISSING)
+    return value
+
+
+#
+# Output file of a "columnar" template: the data line is made of "columns" instead of a Mako template.
+# Records are kept until "columnar_chunk_size" records are received, then each column is read and formatted
+# for all the records at once and the lines are joined and written in one block.
+# The lines are the same as the ones of a Mako template "${record.<field>}" or
+# "${functions['<function>'](record.<field>, <arguments>)}" for each column, joined by "column_separator".
+# The header and footer are Mako templates, like for the other templates.
+#
+class ColumnarOutputFile(object):
+    def __init__(self, config, templates, stream):
+        if not templates.get('columns'):
+            raise Exception("columns are required with template_type columnar, file : "
+                            + templates['output_filename'])
+        rendering_functions = create_rendering_functions()
+        self.templates = templates
+        self.stream = stream
+        self.columns = [Column(column_config, rendering_functions) for column_config in templates['columns']]
+        self.separator = templates.get('column_separator', '')
+        self.chunk_size = templates.get('columnar_chunk_size') or DEFAULT_COLUMNAR_CHUNK_SIZE
+        output_dir = load_config_for_stream(config, 'output_dir', stream)
+        output_file_path = get_abs_path(output_dir) + '/' + templates['output_filename']
+        self.output_file = open_output_file(config, output_file_path, templates, stream)
+        self.records = []
+        self.started = False
+        self.last_values = None
+
+    @property
+    def closed(self):
+        return self.output_file.closed
+
+    def fileno(self):
+        return self.output_file.fileno()
+
+    def render_record(self, record_dict, record_values, schema_values, rendering_functions):
+        if not self.started:
+            self.started = True
+            render_template(self.output_file, self.templates['header'], record_values, schema_values,
+                            rendering_functions)
+        self.records.append(record_dict)
+        self.last_values = (record_values, schema_values)
+        if len(self.records) >= self.chunk_size:
+            self.write_records()
+
+    def write_records(self):
+        records = self.records
+        if not records:
+            return
+        self.records = []
+        report = get_missing_attribute_report()
+        report.set_stream(self.stream)
+        report.set_template(self.templates['output_filename'])
+        metrics = get_metrics()
+        metrics.set_stream(self.stream)
+        start = time.perf_counter()
+        # error message of each row that cannot be rendered, the row is not written
+        invalid_rows = {}
+        columns = [column.format_values(column.get_values(records, invalid_rows), invalid_rows)
+                   for column in self.columns]
+        lines = list(map(self.separator.join, zip(*columns)))
+        for row in sorted(invalid_rows, reverse=True):
+            LOGGER.error(invalid_rows[row])
+            del lines[row]
+        text = "\n".join(lines) + "\n" if lines else ""
+        rendered = time.perf_counter()
+        if text:
+            self.output_file.write(text)
+        if metrics.enabled:
+            for _ in invalid_rows:
+                metrics.add_render_error(self.templates['output_filename'])
+            metrics.add_render(self.templates['output_filename'], rendered - start, time.perf_counter() - rendered,
+                               len(text.encode('utf8', 'replace')))
+
+    def flush(self):
+        self.write_records()
+        self.output_file.flush()
+
+    def render_footers_and_close(self, rendering_functions):
+        self.write_records()
+        if self.last_values is None:
+            self.output_file.close()
+            return
+        record_values, schema_values = self.last_values
+        render_footer_and_close(self.output_file, record_values, schema_values, self.templates, rendering_functions)
+
+    def close(self):
+        self.output_file.close()
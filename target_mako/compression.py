@@ -0,0 +1,149 @@
+import io
+import struct
+import time
+import zlib
+from collections import deque
+
+OUTPUT_COMPRESSIONS = ('gzip', 'bz2', 'xz', 'zstd')
+
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 6, 'bz2': 9, 'xz': 6, 'zstd': 3}
+
+# uncompressed size of the blocks compressed by each thread of ParallelGzipWriter
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+
+def check_output_compression(compression):
+    if compression not in OUTPUT_COMPRESSIONS:
+        raise Exception("Unknown output_compression {}, expected one of {}".format(compression, OUTPUT_COMPRESSIONS))
+    if compression == 'zstd':
+        load_zstandard()
+
+
+def load_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("output_compression zstd is configured but the zstandard package is not installed")
+    return zstandard
+
+
+def open_compressed_file(output_file_path, compression, level=None, threads=None, append=False):
+    """
+    Return a binary file compressing what is written in it. A file opened in append mode gets a new gzip member,
+    bz2 / xz stream or zstd frame, the decompressed content is the concatenation of all of them.
+    """
+    check_output_compression(compression)
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[compression]
+    mode = "ab" if append else "wb"
+    if compression == 'gzip':
+        if threads and threads > 1:
+            return ParallelGzipWriter(open(output_file_path, mode), threads, level)
+        import gzip
+        return gzip.GzipFile(output_file_path, mode, compresslevel=level)
+    if compression == 'bz2':
+        import bz2
+        return bz2.BZ2File(output_file_path, mode, compresslevel=level)
+    if compression == 'xz':
+        import lzma
+        return lzma.LZMAFile(output_file_path, mode, preset=level)
+    zstandard = load_zstandard()
+    compressor = zstandard.ZstdCompressor(level=level, threads=threads or 0)
+    return compressor.stream_writer(open(output_file_path, mode), closefd=True)
+
+
+def compress_data(data, compression, level=None):
+    # whole file content compressed at once (files of "one_file_per_record" templates)
+    check_output_compression(compression)
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[compression]
+    if compression == 'gzip':
+        import gzip
+        return gzip.compress(data, compresslevel=level)
+    if compression == 'bz2':
+        import bz2
+        return bz2.compress(data, compresslevel=level)
+    if compression == 'xz':
+        import lzma
+        return lzma.compress(data, preset=level)
+    return load_zstandard().ZstdCompressor(level=level).compress(data)
+
+
+#
+# gzip file compressed by blocks in a pool of threads, like pigz.
+# Each block is compressed as raw deflate data ending with a sync flush, so the blocks can be compressed
+# independently and written one after the other as a single deflate stream. The CRC and size of the gzip
+# trailer are computed on the uncompressed blocks. zlib releases the GIL while it compresses.
+#
+class ParallelGzipWriter(io.BufferedIOBase):
+    def __init__(self, raw_file, threads, level=6, block_size=DEFAULT_BLOCK_SIZE):
+        from concurrent.futures import ThreadPoolExecutor
+
+        super().__init__()
+        self.raw_file = raw_file
+        self.level = level
+        self.block_size = block_size
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="target-mako-gzip")
+        self.max_pending_blocks = threads * 2
+        self.pending_blocks = deque()
+        self.block = bytearray()
+        self.crc = 0
+        self.size = 0
+        # magic, deflate, no flags, modification time, no extra flags, unknown OS
+        self.raw_file.write(struct.pack("<BBBBIBB", 0x1f, 0x8b, 8, 0, int(time.time()), 0, 255))
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        return self.raw_file.fileno()
+
+    def write(self, data):
+        self.block += data
+        if len(self.block) >= self.block_size:
+            self.submit_block()
+        return len(data)
+
+    def submit_block(self):
+        if not self.block:
+            return
+        block = bytes(self.block)
+        self.block = bytearray()
+        self.crc = zlib.crc32(block, self.crc)
+        self.size += len(block)
+        self.pending_blocks.append(self.executor.submit(compress_block, block, self.level))
+        while len(self.pending_blocks) > self.max_pending_blocks:
+            self.raw_file.write(self.pending_blocks.popleft().result())
+
+    def write_pending_blocks(self):
+        while self.pending_blocks:
+            self.raw_file.write(self.pending_blocks.popleft().result())
+
+    def flush(self):
+        if self.closed:
+            return
+        self.submit_block()
+        self.write_pending_blocks()
+        self.raw_file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.submit_block()
+            self.write_pending_blocks()
+            # empty last deflate block, then the gzip trailer
+            self.raw_file.write(zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH))
+            self.raw_file.write(struct.pack("<II", self.crc & 0xffffffff, self.size & 0xffffffff))
+        finally:
+            self.executor.shutdown()
+            try:
+                # io.BufferedIOBase.close flushes the file first
+                super().close()
+            finally:
+                self.raw_file.close()
+
+
+def compress_block(block, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
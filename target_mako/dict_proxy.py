@@ -1,8 +1,15 @@
+import json
+import threading
+from collections import Counter
 from functools import singledispatch
-from types import SimpleNamespace
+from types import MappingProxyType, SimpleNamespace
 from typing import Any
 
-import singer
+from target_mako.logger import get_logger
+
+LOGGER = get_logger()
+
+MISSING_ATTRIBUTE_REPORT_MODES = ('off', 'aggregate', 'debug')
 
 
 @singledispatch
@@ -26,16 +33,135 @@ def _wrap_list(ob):
 class SafeNamespace(SimpleNamespace):
     def __getattribute__(self, name: str) -> Any:
         try:
-            logger = singer.get_logger()
-            value = super(SafeNamespace, self).__getattribute__(name)
-            if value is None:
-                logger.info("attribute : '" + name + "' is null returning empty value")
-                return SafeNone
-            else:
-                return value
+            value = _get_attribute(self, name)
         except AttributeError:
-            logger.info("attribute : '" + name + "' doesn't exists returning empty value")
+            _MISSING_ATTRIBUTE_REPORT.missing(name)
             return SafeNone
+        if value is None:
+            _MISSING_ATTRIBUTE_REPORT.null(name)
+            return SafeNone
+        return value
+
+
+_get_attribute = SimpleNamespace.__getattribute__
+
+
+def lazy_namespace(ob, name=None, parent=None):
+    if ob is None:
+        return SafeNone()
+    if isinstance(ob, dict):
+        return LazyNamespace(ob, name, parent)
+    if isinstance(ob, list):
+        return LazyList(ob, name, parent)
+    return ob
+
+
+#
+# Common part of the lazy wrappers: the wrapped value and where it comes from.
+# The attribute path is only computed when a null or missing attribute is reported.
+#
+class _LazyNode(object):
+    __slots__ = ('_values', '_name', '_parent', '_children')
+
+    def __init__(self, values, name=None, parent=None):
+        self._values = values
+        self._name = name
+        self._parent = parent
+        # source value and wrapper of each child read, created on the first one
+        self._children = None
+
+
+_get_lazy_values = _LazyNode.__dict__['_values'].__get__
+_get_lazy_name = _LazyNode.__dict__['_name'].__get__
+_get_lazy_parent = _LazyNode.__dict__['_parent'].__get__
+_get_lazy_children = _LazyNode.__dict__['_children'].__get__
+_set_lazy_children = _LazyNode.__dict__['_children'].__set__
+
+
+def lazy_attribute_path(parent, name):
+    names = [name]
+    while parent is not None:
+        if parent.__class__ is LazyList:
+            parent_name, parent = parent._name, parent._parent
+        else:
+            parent_name, parent = _get_lazy_name(parent), _get_lazy_parent(parent)
+        if parent_name is not None:
+            names.append(parent_name)
+    path = ''
+    for path_name in reversed(names):
+        if path and path_name != '[]':
+            path += '.'
+        path += path_name
+    return path
+
+
+#
+# A null safe attribute view over a dict.
+# Unlike wrap_namespace, nothing is copied: child dicts and lists are wrapped only when the template reads them.
+# vars(record) and record.__dict__ give a read-only view of the dict.
+# The wrapped child dicts and lists are kept, a list read again in a loop ("record.items[i]") is not copied again.
+#
+class LazyNamespace(_LazyNode):
+    __slots__ = ()
+
+    def __getattribute__(self, name):
+        try:
+            value = _get_lazy_values(self)[name]
+        except KeyError:
+            if name == '__dict__':
+                return MappingProxyType(_get_lazy_values(self))
+            if name.startswith('__'):
+                # keep python protocols (copy, pickle, ...) working
+                return object.__getattribute__(self, name)
+            _MISSING_ATTRIBUTE_REPORT.missing(name, self)
+            return SafeNone
+        if value is None:
+            _MISSING_ATTRIBUTE_REPORT.null(name, self)
+            return SafeNone
+        if isinstance(value, dict):
+            return _get_lazy_child(self, name, value, LazyNamespace)
+        if isinstance(value, list):
+            return _get_lazy_child(self, name, value, LazyList)
+        return value
+
+    def __repr__(self):
+        return 'LazyNamespace(' + repr(_get_lazy_values(self)) + ')'
+
+
+def _get_lazy_child(parent, name, value, wrapper_class):
+    children = _get_lazy_children(parent)
+    if children is None:
+        children = {}
+        _set_lazy_children(parent, children)
+    child = children.get(name)
+    # a value replaced in the dict gets a new wrapper
+    if child is None or child[0] is not value:
+        child = children[name] = (value, wrapper_class(value, name, parent))
+    return child[1]
+
+
+#
+# A list whose items are wrapped when the template reads them.
+# It holds a shallow copy of the wrapped list, made once and kept by its parent, so it can be used where a list is
+# expected. As with wrap_namespace, json.dumps reads the wrapped items: lists of values can be serialized, not lists
+# of objects or nulls.
+#
+class LazyList(list):
+    __slots__ = ('_name', '_parent')
+
+    def __init__(self, values, name=None, parent=None):
+        list.__init__(self, values)
+        self._name = name
+        self._parent = parent
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyList(list.__getitem__(self, index), self._name, self._parent)
+        return lazy_namespace(list.__getitem__(self, index), '[]', self)
+
+    def __iter__(self):
+        for value in list.__iter__(self):
+            yield lazy_namespace(value, '[]', self)
 
 
 #
@@ -56,8 +182,7 @@ class Meta(type):
 
 class SafeNone(object, metaclass=Meta):
     def __getattribute__(self, name):
-        logger = singer.get_logger()
-        logger.info("attribute : '" + name + "' doesn't exists returning empty value")
+        # not reported, the null or missing attribute at the start of the chain already is
         return SafeNone()
 
     def __str__(self):
@@ -65,3 +190,103 @@ class SafeNone(object, metaclass=Meta):
 
     def __repr__(self):
         return ''
+
+
+#
+# Collects the null or missing attributes read by the templates.
+# modes:
+#   - off : nothing is reported
+#   - aggregate : accesses are counted in memory per stream, template and attribute path, see summary
+#   - debug : one debug log line per access
+#
+class MissingAttributeReport(object):
+    def __init__(self, mode='aggregate'):
+        if mode not in MISSING_ATTRIBUTE_REPORT_MODES:
+            raise Exception("Unknown missing attribute report mode {}, expected one of {}"
+                            .format(mode, MISSING_ATTRIBUTE_REPORT_MODES))
+        self.mode = mode
+        # the stream and template being rendered and the counts, one per rendering thread
+        self.context = threading.local()
+        self.lock = threading.Lock()
+        # counts collected by other processes
+        self.merged_counts = Counter()
+        self.thread_counts = [self.merged_counts]
+
+    @property
+    def counts(self):
+        counts = Counter()
+        with self.lock:
+            for thread_counts in self.thread_counts:
+                counts.update(thread_counts)
+        return counts
+
+    def set_stream(self, stream):
+        self.context.stream = stream
+
+    def set_template(self, template):
+        self.context.template = template
+
+    def missing(self, name, parent=None):
+        if self.mode == 'aggregate':
+            self._count('missing', name, parent)
+        elif self.mode == 'debug':
+            LOGGER.debug("attribute : '%s' doesn't exists returning empty value", lazy_attribute_path(parent, name))
+
+    def null(self, name, parent=None):
+        if self.mode == 'aggregate':
+            self._count('null', name, parent)
+        elif self.mode == 'debug':
+            LOGGER.debug("attribute : '%s' is null returning empty value", lazy_attribute_path(parent, name))
+
+    def _count(self, kind, name, parent):
+        context = self.context
+        try:
+            counts = context.counts
+        except AttributeError:
+            counts = context.counts = self._new_counts()
+        counts[(getattr(context, 'stream', None), getattr(context, 'template', None),
+                lazy_attribute_path(parent, name), kind)] += 1
+
+    def _new_counts(self):
+        counts = Counter()
+        with self.lock:
+            self.thread_counts.append(counts)
+        return counts
+
+    def merge(self, counts):
+        with self.lock:
+            self.merged_counts.update(counts)
+
+    def take_counts(self):
+        counts = Counter()
+        with self.lock:
+            for thread_counts in self.thread_counts:
+                counts.update(thread_counts)
+                thread_counts.clear()
+        return counts
+
+    def summary(self):
+        return [{"stream": stream, "template": template, "attribute": attribute, "kind": kind, "count": count}
+                for (stream, template, attribute, kind), count in self.counts.most_common()]
+
+    def emit_summary(self, report_file=None):
+        if self.mode != 'aggregate':
+            return
+        summary = self.summary()
+        LOGGER.info("Missing attribute report: %s", json.dumps(summary))
+        if report_file:
+            with open(report_file, "w", encoding="utf8") as output_file:
+                json.dump(summary, output_file, indent=2)
+
+
+_MISSING_ATTRIBUTE_REPORT = MissingAttributeReport()
+
+
+def set_missing_attribute_report(mode):
+    global _MISSING_ATTRIBUTE_REPORT
+    _MISSING_ATTRIBUTE_REPORT = MissingAttributeReport(mode)
+    return _MISSING_ATTRIBUTE_REPORT
+
+
+def get_missing_attribute_report():
+    return _MISSING_ATTRIBUTE_REPORT
@@ -1,4 +1,14 @@
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+
+from target_mako.logger import get_logger
+
+LOGGER = get_logger()
+
+ISO_DATE_FORMAT = '%Y-%m-%d'
+
+# number of (value, input format, output format) kept by the date format cache
+DEFAULT_DATE_FORMAT_CACHE_SIZE = 10000
 
 
 def create_rendering_functions():
@@ -20,29 +30,78 @@ def format_date(input_value, input_date_format, output_date_format):
     json_date = str(input_value)
     if json_date is None or json_date == '':
         return ""
-    formatted_date = datetime.strptime(json_date, input_date_format).strftime(output_date_format)
-    return formatted_date
+    return _DATE_FORMAT_CACHE.format(json_date, input_date_format, output_date_format)
 
 
 def format_json_date(input_value, date_format):
-    return format_date(input_value, '%Y-%m-%d', date_format)
+    return format_date(input_value, ISO_DATE_FORMAT, date_format)
+
+
+def parse_and_format_date(json_date, input_date_format, output_date_format):
+    if input_date_format == ISO_DATE_FORMAT and len(json_date) == 10 and json_date[4] == '-' and json_date[7] == '-':
+        # much faster than strptime, same date
+        try:
+            return date.fromisoformat(json_date).strftime(output_date_format)
+        except ValueError:
+            # strptime raises the usual error
+            pass
+    return datetime.strptime(json_date, input_date_format).strftime(output_date_format)
+
+
+#
+# Formatted dates are kept in a LRU cache: the same dates are usually found in many records.
+# The cache is shared by all streams and threads of the run, its hits and misses are logged at the end of the run.
+#
+class DateFormatCache(object):
+    def __init__(self, size=DEFAULT_DATE_FORMAT_CACHE_SIZE):
+        self.size = size
+        self.format = lru_cache(maxsize=size)(parse_and_format_date)
+
+    def log_stats(self):
+        cache_info = self.format.cache_info()
+        calls = cache_info.hits + cache_info.misses
+        hit_rate = cache_info.hits / calls if calls else 0
+        LOGGER.info("Date format cache: {} hits, {} misses ({:.1%} hit rate)".format(cache_info.hits,
+                                                                                      cache_info.misses, hit_rate))
+
+
+_DATE_FORMAT_CACHE = DateFormatCache()
+
+
+def get_date_format_cache():
+    return _DATE_FORMAT_CACHE
+
+
+def configure_date_format_cache(size=DEFAULT_DATE_FORMAT_CACHE_SIZE):
+    global _DATE_FORMAT_CACHE
+    _DATE_FORMAT_CACHE = DateFormatCache(size)
+    return _DATE_FORMAT_CACHE
 
 
 def fixed_size(input_value, string_size, prefix="{:<", postfix="}"):
     json_string = str(input_value)
-    return (prefix + str(string_size) + postfix).format(json_string[:string_size])
+    return get_fixed_size_format(prefix, string_size, postfix)(json_string[:string_size])
+
+
+@lru_cache(maxsize=1024)
+def get_fixed_size_format(prefix, string_size, postfix):
+    # the format string is built and parsed once per size
+    return (prefix + str(string_size) + postfix).format
 
 
+# lfixed, rfixed and nfixed are called for every field of fixed width files, they pad the value with the str methods
+# and give the same result as fixed_size with "{:<", "{:>" and "{:0>".
 def lfixed(input_value, string_size):
-    return fixed_size(input_value, string_size)
+    return str(input_value)[:string_size].ljust(string_size)
 
 
 def rfixed(input_value, string_size):
-    return fixed_size(input_value, string_size, "{:>")
+    return str(input_value)[:string_size].rjust(string_size)
 
 
 def nfixed(input_value, string_size):
-    return fixed_size(input_value, string_size, "{:0>")
+    # not str.zfill, the sign must not be moved before the zeros
+    return str(input_value)[:string_size].rjust(string_size, "0")
 
 
 def null_safe(json_number):
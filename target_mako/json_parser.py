@@ -0,0 +1,39 @@
+import importlib
+import json
+
+JSON_PARSERS = ('auto', 'orjson', 'simdjson', 'ujson', 'json')
+
+# preferred order when "auto" is configured
+AUTO_JSON_PARSERS = ('orjson', 'simdjson', 'ujson')
+
+
+def load_json_parser(name='auto'):
+    """
+    Return (parser name, loads function) for the configured parser.
+    The loads function accepts str or bytes lines, lines rejected by a fast parser are parsed again by the
+    standard json module (NaN values for example) so both give the same result.
+    """
+    if name not in JSON_PARSERS:
+        raise Exception("Unknown json_parser {}, expected one of {}".format(name, JSON_PARSERS))
+    if name == 'json':
+        return 'json', json.loads
+    candidates = AUTO_JSON_PARSERS if name == 'auto' else (name,)
+    for candidate in candidates:
+        try:
+            module = importlib.import_module(candidate)
+        except ImportError:
+            if name != 'auto':
+                raise Exception("json_parser {} is configured but the {} package is not installed"
+                                .format(name, candidate))
+            continue
+        return candidate, with_json_fallback(module.loads)
+    return 'json', json.loads
+
+
+def with_json_fallback(fast_loads):
+    def loads(line):
+        try:
+            return fast_loads(line)
+        except ValueError:
+            return json.loads(line)
+    return loads
@@ -0,0 +1,16 @@
+import importlib.util
+import logging
+import logging.config
+import os
+
+
+def get_logger():
+    """
+    Same logger as singer.get_logger(), configured by the logging.conf file of the singer package.
+    The singer package is located without being imported: importing it loads jsonschema, dateutil, backoff...
+    and slows down the start of every run.
+    """
+    singer_spec = importlib.util.find_spec('singer')
+    path = os.path.join(singer_spec.submodule_search_locations[0], 'logging.conf')
+    logging.config.fileConfig(path, disable_existing_loggers=False)
+    return logging.getLogger()
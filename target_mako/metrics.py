@@ -0,0 +1,227 @@
+import json
+import math
+import threading
+import time
+from collections import Counter
+
+from target_mako.logger import get_logger
+
+LOGGER = get_logger()
+
+DEFAULT_METRICS_INTERVAL_SECONDS = 60
+
+# render latencies are counted in buckets growing by 5%, the percentiles are the upper bound of their bucket
+BUCKETS_PER_UNIT = 1 / math.log(1.05)
+
+
+#
+# Metrics of a template: renders, errors, rendered bytes and time spent rendering and writing.
+#
+class TemplateMetrics(object):
+    def __init__(self):
+        self.renders = 0
+        self.errors = 0
+        self.bytes = 0
+        self.render_seconds = 0.0
+        self.write_seconds = 0.0
+        self.latency_buckets = Counter()
+
+    def add_render(self, render_seconds, write_seconds, rendered_bytes):
+        self.renders += 1
+        self.bytes += rendered_bytes
+        self.render_seconds += render_seconds
+        self.write_seconds += write_seconds
+        if render_seconds > 0:
+            self.latency_buckets[math.ceil(math.log(render_seconds) * BUCKETS_PER_UNIT)] += 1
+
+    def values(self):
+        return self.renders, self.errors, self.bytes, self.render_seconds, self.write_seconds, \
+            dict(self.latency_buckets)
+
+    def merge(self, values):
+        renders, errors, rendered_bytes, render_seconds, write_seconds, latency_buckets = values
+        self.renders += renders
+        self.errors += errors
+        self.bytes += rendered_bytes
+        self.render_seconds += render_seconds
+        self.write_seconds += write_seconds
+        self.latency_buckets.update(latency_buckets)
+
+    def percentile(self, percent):
+        total = sum(self.latency_buckets.values())
+        if not total:
+            return None
+        rank = total * percent / 100
+        seen = 0
+        for bucket in sorted(self.latency_buckets):
+            seen += self.latency_buckets[bucket]
+            if seen >= rank:
+                return math.exp(bucket / BUCKETS_PER_UNIT)
+        return None
+
+
+#
+# Time spent in each stage of the run, per stream and per template:
+#   - parse : JSON parsing of the input lines (not per stream)
+#   - validate : record validation
+#   - wrap : records and schemas wrapped for the templates
+#   - render : Mako template calls
+#   - write : rendered text written to the output files
+# When disabled (default) nothing is measured, the instrumented functions only check the "enabled" flag.
+# Processes ("render_processes" and "stream_workers" processes) send their counts back with their results,
+# the counts are merged in the metrics of the main process.
+#
+class StageMetrics(object):
+    def __init__(self, enabled=False, interval_seconds=DEFAULT_METRICS_INTERVAL_SECONDS):
+        self.enabled = enabled
+        self.interval_seconds = interval_seconds
+        self.lock = threading.Lock()
+        # stream being processed, one per thread (stream workers)
+        self.context = threading.local()
+        self.start_time = time.perf_counter()
+        self.last_emit_time = self.start_time
+        self.records = Counter()
+        self.stage_seconds = Counter()
+        self.templates = {}
+
+    def set_stream(self, stream):
+        self.context.stream = stream
+
+    def add_stage_time(self, stage, seconds, stream=None):
+        with self.lock:
+            self.stage_seconds[(stream, stage)] += seconds
+
+    def add_record(self, stream, validate_seconds, wrap_seconds):
+        with self.lock:
+            self.records[stream] += 1
+            self.stage_seconds[(stream, 'validate')] += validate_seconds
+            self.stage_seconds[(stream, 'wrap')] += wrap_seconds
+
+    def add_render(self, template, render_seconds, write_seconds, rendered_bytes):
+        stream = getattr(self.context, 'stream', None)
+        with self.lock:
+            self.get_template_metrics(stream, template).add_render(render_seconds, write_seconds, rendered_bytes)
+            self.stage_seconds[(stream, 'render')] += render_seconds
+            self.stage_seconds[(stream, 'write')] += write_seconds
+
+    def add_write_time(self, seconds):
+        stream = getattr(self.context, 'stream', None)
+        with self.lock:
+            self.stage_seconds[(stream, 'write')] += seconds
+
+    def add_render_error(self, template):
+        stream = getattr(self.context, 'stream', None)
+        with self.lock:
+            self.get_template_metrics(stream, template).errors += 1
+
+    def get_template_metrics(self, stream, template):
+        key = (stream, template)
+        template_metrics = self.templates.get(key)
+        if template_metrics is None:
+            template_metrics = self.templates[key] = TemplateMetrics()
+        return template_metrics
+
+    def merge(self, counts):
+        records, stage_seconds, templates = counts
+        with self.lock:
+            self.records.update(records)
+            self.stage_seconds.update(stage_seconds)
+            for (stream, template), values in templates.items():
+                self.get_template_metrics(stream, template).merge(values)
+
+    def take_counts(self):
+        # counts of a process sent back to the main process, they are counted only once
+        with self.lock:
+            counts = (dict(self.records), dict(self.stage_seconds),
+                      {key: template_metrics.values() for key, template_metrics in self.templates.items()})
+            self.records = Counter()
+            self.stage_seconds = Counter()
+            self.templates = {}
+        return counts
+
+    def emit_if_due(self):
+        now = time.perf_counter()
+        if now - self.last_emit_time >= self.interval_seconds:
+            self.last_emit_time = now
+            self.emit()
+
+    def emit(self):
+        # same format as the singer-python metrics log lines
+        for metric_type, metric, value, tags in self.metric_values():
+            LOGGER.info("METRIC: %s", json.dumps({"type": metric_type, "metric": metric, "value": value,
+                                                   "tags": tags}))
+
+    def metric_values(self):
+        elapsed = time.perf_counter() - self.start_time
+        with self.lock:
+            values = []
+            for stream, records in sorted(self.records.items()):
+                values.append(("counter", "record_count", records, {"stream": stream}))
+                values.append(("gauge", "records_per_second", records / elapsed if elapsed else 0,
+                               {"stream": stream}))
+            for (stream, stage), seconds in sorted(self.stage_seconds.items(), key=str):
+                values.append(("timer", "stage_seconds", seconds, {"stream": stream, "stage": stage}))
+            for (stream, template), template_metrics in sorted(self.templates.items(), key=str):
+                tags = {"stream": stream, "template": template}
+                values.append(("counter", "render_count", template_metrics.renders, tags))
+                values.append(("counter", "render_errors", template_metrics.errors, tags))
+                values.append(("counter", "bytes_written", template_metrics.bytes, tags))
+                values.append(("timer", "render_latency_p50", template_metrics.percentile(50), tags))
+                values.append(("timer", "render_latency_p99", template_metrics.percentile(99), tags))
+        return values
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start_time
+        with self.lock:
+            streams = {}
+            for (stream, stage), seconds in self.stage_seconds.items():
+                if stream is not None:
+                    streams.setdefault(stream, {"records": 0, "records_per_second": 0, "stages": {}})
+                    streams[stream]["stages"][stage] = seconds
+            for stream, records in self.records.items():
+                streams[stream]["records"] = records
+                streams[stream]["records_per_second"] = records / elapsed if elapsed else 0
+            templates = [{"stream": stream, "template": template, "renders": template_metrics.renders,
+                          "errors": template_metrics.errors, "bytes_written": template_metrics.bytes,
+                          "render_seconds": template_metrics.render_seconds,
+                          "write_seconds": template_metrics.write_seconds,
+                          "render_latency_p50": template_metrics.percentile(50),
+                          "render_latency_p99": template_metrics.percentile(99)}
+                         for (stream, template), template_metrics in self.templates.items()]
+            return {"elapsed_seconds": elapsed, "parse_seconds": self.stage_seconds[(None, 'parse')],
+                    "streams": streams, "templates": templates}
+
+    def emit_summary(self, metrics_file=None):
+        if not self.enabled:
+            return
+        self.emit()
+        summary = self.summary()
+        LOGGER.info("Metrics summary: %s", json.dumps(summary))
+        if metrics_file:
+            with open(metrics_file, "w", encoding="utf8") as output_file:
+                json.dump(summary, output_file, indent=2)
+
+
+def timed_json_loads(metrics, json_loads):
+    perf_counter = time.perf_counter
+
+    def loads(line):
+        start = perf_counter()
+        o = json_loads(line)
+        metrics.add_stage_time('parse', perf_counter() - start)
+        metrics.emit_if_due()
+        return o
+    return loads
+
+
+_METRICS = StageMetrics()
+
+
+def set_metrics(enabled, interval_seconds=DEFAULT_METRICS_INTERVAL_SECONDS):
+    global _METRICS
+    _METRICS = StageMetrics(enabled, interval_seconds)
+    return _METRICS
+
+
+def get_metrics():
+    return _METRICS
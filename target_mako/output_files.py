@@ -0,0 +1,166 @@
+import io
+import os
+import string
+import time
+
+from target_mako.compression import open_compressed_file
+from target_mako.dict_proxy import get_missing_attribute_report
+from target_mako.logger import get_logger
+from target_mako.metrics import get_metrics
+from target_mako.output_writer import DEFAULT_EOL, AtomicOutputFile, BufferedOutputWriter, OneShotOutputWriter, \
+    create_temporary_file, make_output_directory, open_buffered_output_writer
+
+LOGGER = get_logger()
+
+
+def get_abs_path(path):
+    path_os = path.replace("/", os.path.sep)
+    pathname = os.path.join(os.getcwd(), path_os)
+    return pathname
+
+
+def load_config_for_stream(config, key, stream_id):
+    value = None
+    if key in config:
+        value = config[key]
+    if "stream_configs" in config and stream_id in config["stream_configs"] \
+            and key in config["stream_configs"][stream_id]:
+        value = config["stream_configs"][stream_id][key]
+    return value
+
+
+def render_footer_and_close(output_file, record_values, schema_values, templates, rendering_functions):
+    render_template(output_file, templates['footer'], record_values, schema_values, rendering_functions)
+    # close the file
+    metrics = get_metrics()
+    if metrics.enabled:
+        start = time.perf_counter()
+        output_file.close()
+        metrics.add_write_time(time.perf_counter() - start)
+    else:
+        output_file.close()
+
+
+def render_template(output_file, template, record_values, schema_values, rendering_functions):
+    if template is None:
+        return
+    get_missing_attribute_report().set_template(template.uri)
+    metrics = get_metrics()
+    if metrics.enabled:
+        render_template_with_metrics(metrics, output_file, template, record_values, schema_values,
+                                     rendering_functions)
+        return
+    try:
+        output_file.write(template.render(record=record_values, schema=schema_values,
+                                          functions=rendering_functions) + "\n")
+    except Exception as exc:
+        log_template_error(exc)
+
+
+def render_template_with_metrics(metrics, output_file, template, record_values, schema_values, rendering_functions):
+    start = time.perf_counter()
+    try:
+        text = template.render(record=record_values, schema=schema_values, functions=rendering_functions) + "\n"
+    except Exception as exc:
+        metrics.add_render_error(template.uri)
+        log_template_error(exc)
+        return
+    rendered = time.perf_counter()
+    output_file.write(text)
+    # UTF-8 size of the rendered text, before the end of line translation and the compression
+    metrics.add_render(template.uri, rendered - start, time.perf_counter() - rendered,
+                       len(text.encode('utf8', 'replace')))
+
+
+def log_template_error(exc):
+    if isinstance(exc, AttributeError):
+        LOGGER.error(str(exc))
+    else:
+        # mako.exceptions imports pygments, it is only loaded when a template fails
+        from mako import exceptions
+        LOGGER.error(exceptions.text_error_template().render())
+
+
+def open_output_file(config, output_file_path, templates, stream, append=False, temporary_path=None):
+    output_file_encoding = "utf8"
+    if "output_file_encoding" in templates:
+        output_file_encoding = templates['output_file_encoding']
+    output_file_EOL = DEFAULT_EOL
+    if "output_file_EOL" in templates:
+        output_file_EOL = templates['output_file_EOL']
+    output_buffer_size = load_config_for_stream(config, 'output_buffer_size', stream)
+    if "output_buffer_size" in templates:
+        output_buffer_size = templates['output_buffer_size']
+    output_compression = templates.get('output_compression')
+    output_compression_level = templates.get('output_compression_level')
+    make_output_directory(os.path.dirname(output_file_path))
+    write_pool = templates.get('output_write_pool')
+    rename_batch = templates.get('atomic_rename_batch')
+    if temporary_path is None and load_config_for_stream(config, 'atomic_output', stream):
+        # written as "<output file>.<random>.tmp", renamed when it is closed
+        temporary_path = create_temporary_file(output_file_path)
+    written_file_path = temporary_path or output_file_path
+    if (output_buffer_size or write_pool is not None) and templates.get('one_file_per_record'):
+        # the whole file is rendered in memory and written at once when it is closed (by the write pool if any)
+        output_file = OneShotOutputWriter(output_file_path, output_file_encoding, output_file_EOL, write_pool,
+                                          output_compression, output_compression_level, temporary_path, rename_batch)
+    elif output_compression:
+        # the encoded text is written through a streaming compressor
+        compressed_file = open_compressed_file(written_file_path, output_compression, output_compression_level,
+                                               templates.get('output_compression_threads'), append)
+        if output_buffer_size:
+            output_file = BufferedOutputWriter(compressed_file, output_file_encoding, output_file_EOL,
+                                               output_buffer_size)
+        else:
+            output_file = io.TextIOWrapper(compressed_file, encoding=output_file_encoding, newline=output_file_EOL)
+    elif output_buffer_size:
+        # rendered blocks are kept in memory, encoded and written in large blocks
+        output_file = open_buffered_output_writer(written_file_path, output_file_encoding, output_file_EOL,
+                                                  output_buffer_size, append)
+    else:
+        output_file = open(written_file_path, "a" if append else "w+", encoding=output_file_encoding,
+                           newline=output_file_EOL)
+    if temporary_path and not isinstance(output_file, OneShotOutputWriter):
+        output_file = AtomicOutputFile(output_file, temporary_path, output_file_path, rename_batch)
+    written_files = templates.get('written_files')
+    if written_files is not None:
+        written_files.add(output_file, written_file_path, output_file_path)
+    return output_file
+
+
+#
+# Output file name of a "one_file_per_record" template, parsed once.
+# "{key}" fields are replaced by the record values (empty if the record has no such key), the names using
+# attributes, indexes, conversions or nested fields are formatted by BlankFormatter.
+#
+class OutputFilePattern(object):
+    def __init__(self, output_dir, output_filename):
+        self.output_dir = output_dir
+        self.output_filename = output_filename
+        self.fields = []
+        self.simple = True
+        for literal, field_name, format_spec, conversion in BlankFormatter().parse(output_filename):
+            if field_name is not None and (not field_name.isidentifier() or conversion or '{' in format_spec):
+                self.simple = False
+            self.fields.append((literal, field_name, format_spec))
+
+    def format(self, record_dict):
+        if not self.simple:
+            return self.output_dir + '/' + BlankFormatter().format(self.output_filename, **record_dict)
+        parts = [self.output_dir, '/']
+        for literal, field_name, format_spec in self.fields:
+            parts.append(literal)
+            if field_name is not None:
+                parts.append(format(record_dict.get(field_name, ''), format_spec))
+        return ''.join(parts)
+
+
+class BlankFormatter(string.Formatter):
+    def __init__(self, default=''):
+        self.default = default
+
+    def get_value(self, key, args, kwds):
+        if isinstance(key, str):
+            return kwds.get(key, self.default)
+        else:
+            return string.Formatter.get_value(key, args, kwds)
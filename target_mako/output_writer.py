@@ -0,0 +1,395 @@
+import codecs
+import os
+import tempfile
+import threading
+
+DEFAULT_EOL = "\r\n"
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# flags of the files written at once by OneShotOutputWriter
+ONE_SHOT_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# suffix of the files written by the atomic output until they are complete
+TEMPORARY_SUFFIX = ".tmp"
+
+# output directories created (or found) during the run
+_KNOWN_DIRECTORIES = set()
+
+# permissions of the new files, read once (os.umask can only be read by changing it)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def translate_eol(text, eol):
+    # same newline rules as io.TextIOWrapper on write
+    if eol is None:
+        eol = os.linesep
+    if eol == '' or eol == '\n':
+        return text
+    return text.replace('\n', eol)
+
+
+#
+# A text file writer that keeps the rendered chunks in memory and writes them in large blocks.
+# End of lines are translated and text is encoded once per block instead of once per write.
+#
+class BufferedOutputWriter(object):
+    def __init__(self, raw_file, encoding="utf8", eol=DEFAULT_EOL, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.raw_file = raw_file
+        self.encoding = encoding
+        # the byte order mark of encodings like "utf-8-sig" is only written once, like with a text file
+        self.encoder = codecs.getincrementalencoder(encoding)()
+        self.eol = eol
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.buffered_size = 0
+
+    @property
+    def closed(self):
+        return self.raw_file.closed
+
+    def readable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        return self.raw_file.fileno()
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.buffered_size += len(text)
+        if self.buffered_size >= self.buffer_size:
+            self.write_chunks()
+        return len(text)
+
+    def write_chunks(self):
+        if self.chunks:
+            text = translate_eol(''.join(self.chunks), self.eol)
+            self.raw_file.write(self.encoder.encode(text))
+            self.chunks = []
+            self.buffered_size = 0
+
+    def flush(self):
+        self.write_chunks()
+        self.raw_file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.write_chunks()
+        finally:
+            self.raw_file.close()
+
+
+#
+# A file written once, when it is closed, with raw os.open / os.write / os.close calls.
+# Used for the small files of "one_file_per_record" templates: the whole file is rendered in memory first.
+#
+class OneShotOutputWriter(object):
+    def __init__(self, output_file_path, encoding="utf8", eol=DEFAULT_EOL, write_pool=None, compression=None,
+                 compression_level=None, temporary_path=None, rename_batch=None):
+        self.output_file_path = output_file_path
+        # atomic output: the file is written as temporary_path and renamed
+        self.temporary_path = temporary_path
+        self.rename_batch = rename_batch
+        self.encoding = encoding
+        self.eol = eol
+        self.write_pool = write_pool
+        self.compression = compression
+        self.compression_level = compression_level
+        self.chunks = []
+        self.closed = False
+
+    def readable(self):
+        return False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.chunks.append(text)
+        return len(text)
+
+    def flush(self):
+        # nothing is written before the file is closed
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        data = translate_eol(''.join(self.chunks), self.eol).encode(self.encoding)
+        self.chunks = []
+        if self.compression:
+            from target_mako.compression import compress_data
+            data = compress_data(data, self.compression, self.compression_level)
+        if self.write_pool is not None:
+            self.write_pool.submit(self.output_file_path, data, self.temporary_path, self.rename_batch)
+        else:
+            write_output_file(self.output_file_path, data, self.temporary_path, self.rename_batch)
+
+
+def write_output_file(output_file_path, data, temporary_path=None, rename_batch=None):
+    data = memoryview(data)
+    fd = os.open(temporary_path or output_file_path, ONE_SHOT_OPEN_FLAGS, 0o666)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+    if temporary_path:
+        rename_output_file(temporary_path, output_file_path, rename_batch)
+
+
+def rename_output_file(temporary_path, output_file_path, rename_batch=None):
+    if rename_batch is not None:
+        rename_batch.add(temporary_path, output_file_path)
+    else:
+        os.replace(temporary_path, output_file_path)
+
+
+def create_temporary_file(output_file_path):
+    # a new name for each written file, the files with the same name never share their temporary file
+    fd, temporary_path = tempfile.mkstemp(suffix=TEMPORARY_SUFFIX, prefix=os.path.basename(output_file_path) + ".",
+                                          dir=os.path.dirname(output_file_path))
+    os.close(fd)
+    # mkstemp creates a private file, the output files keep the default permissions
+    os.chmod(temporary_path, 0o666 & ~_UMASK)
+    return temporary_path
+
+
+#
+# Output file written as "<output file>.<random>.tmp" and renamed when it is closed, so the readers of the output
+# directory never see a partial file. A run that fails leaves the ".tmp" files.
+#
+class AtomicOutputFile(object):
+    def __init__(self, output_file, temporary_path, output_file_path, rename_batch=None):
+        self.output_file = output_file
+        self.temporary_path = temporary_path
+        self.output_file_path = output_file_path
+        self.rename_batch = rename_batch
+
+    @property
+    def closed(self):
+        return self.output_file.closed
+
+    def readable(self):
+        return self.output_file.readable()
+
+    def writable(self):
+        return self.output_file.writable()
+
+    def fileno(self):
+        return self.output_file.fileno()
+
+    def write(self, text):
+        return self.output_file.write(text)
+
+    def flush(self):
+        self.output_file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.output_file.close()
+        rename_output_file(self.temporary_path, self.output_file_path, self.rename_batch)
+
+    def close_temporary(self):
+        # the file is not complete yet, it is reopened later in append mode
+        self.output_file.close()
+
+
+#
+# Renames the atomic output files by batches: the files of the whole batch are synced to disk together before they
+# are renamed, then the renamed entries are synced with their directories.
+# A file written again before the batch is renamed replaces the pending one.
+#
+class RenameBatch(object):
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        # temporary path of each output file path
+        self.renames = {}
+
+    def add(self, temporary_path, output_file_path):
+        with self.lock:
+            replaced_path = self.renames.pop(output_file_path, None)
+            if replaced_path is not None:
+                os.remove(replaced_path)
+            self.renames[output_file_path] = temporary_path
+            if len(self.renames) >= self.batch_size:
+                self.commit_renames()
+
+    def commit(self):
+        with self.lock:
+            self.commit_renames()
+
+    def commit_renames(self):
+        if not self.renames:
+            return
+        for temporary_path in self.renames.values():
+            sync_file(temporary_path)
+        directories = set()
+        for output_file_path, temporary_path in self.renames.items():
+            os.replace(temporary_path, output_file_path)
+            directories.add(os.path.dirname(output_file_path))
+        self.renames = {}
+        for directory in directories:
+            sync_directory(directory)
+
+
+def sync_file(path):
+    # the descriptor is writable, an fsync with a read only descriptor fails on some platforms (Windows)
+    fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        # directories cannot be opened on some platforms (Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def create_rename_batch(config):
+    if not config.get('atomic_output_fsync_batch'):
+        return None
+    return RenameBatch(config['atomic_output_fsync_batch'])
+
+
+#
+# Output files opened since the last emitted state ("fsync_output"), synced to disk before the next state is emitted.
+# Only the files of the run are synced (os.sync would write the data of every file system of the host). The files
+# still open are synced again before each state, the closed ones only once.
+#
+class WrittenFiles(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = []
+
+    def add(self, output_file, written_file_path, output_file_path):
+        with self.lock:
+            self.files.append((output_file, written_file_path, output_file_path))
+
+    def sync(self):
+        with self.lock:
+            files = self.files
+            self.files = [entry for entry in files if not entry[0].closed]
+        for output_file, written_file_path, output_file_path in files:
+            if not output_file.closed:
+                # flushed by flush_output_files
+                os.fsync(output_file.fileno())
+            elif os.path.exists(written_file_path):
+                sync_file(written_file_path)
+            else:
+                # renamed by the atomic output
+                sync_file(output_file_path)
+
+
+def create_written_files(config):
+    if not config.get('fsync_output'):
+        return None
+    return WrittenFiles()
+
+
+#
+# Writes the files of "one_file_per_record" templates in a pool of threads, while the next records are rendered.
+# Each path is always written by the same thread, so the files with the same name are written in record order and
+# the last record wins, as without the pool.
+# At most "queue_size" files wait to be written, the first write error is raised by the next submit or wait.
+#
+class OutputWritePool(object):
+    def __init__(self, threads, queue_size=1000):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.executors = [ThreadPoolExecutor(1, thread_name_prefix="target-mako-writer")
+                          for _ in range(threads)]
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.idle = threading.Condition(self.lock)
+        self.error = None
+
+    def submit(self, output_file_path, data, temporary_path=None, rename_batch=None):
+        self.raise_error()
+        self.slots.acquire()
+        with self.lock:
+            self.pending += 1
+        try:
+            executor = self.executors[hash(output_file_path) % len(self.executors)]
+            executor.submit(self.write, output_file_path, data, temporary_path, rename_batch)
+        except BaseException:
+            self.done()
+            raise
+
+    def write(self, output_file_path, data, temporary_path=None, rename_batch=None):
+        try:
+            write_output_file(output_file_path, data, temporary_path, rename_batch)
+        except Exception as exc:
+            with self.lock:
+                if self.error is None:
+                    self.error = Exception("Unable to write output file {}: {}".format(output_file_path, exc))
+                    self.error.__cause__ = exc
+        finally:
+            self.done()
+
+    def done(self):
+        with self.lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.idle.notify_all()
+        self.slots.release()
+
+    def wait(self):
+        # every file submitted so far is written
+        with self.lock:
+            while self.pending:
+                self.idle.wait()
+        self.raise_error()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+
+def create_output_write_pool(config):
+    threads = config.get('output_write_threads')
+    if not threads:
+        return None
+    return OutputWritePool(threads, config.get('output_write_queue_size', 1000))
+
+
+def make_output_directory(directory):
+    # os.makedirs is called once per directory, not once per output file
+    if directory not in _KNOWN_DIRECTORIES:
+        os.makedirs(directory, exist_ok=True)
+        _KNOWN_DIRECTORIES.add(directory)
+
+
+def forget_output_directories():
+    _KNOWN_DIRECTORIES.clear()
+
+
+def open_buffered_output_writer(output_file_path, encoding="utf8", eol=DEFAULT_EOL, buffer_size=DEFAULT_BUFFER_SIZE,
+                                append=False):
+    output_file = BufferedOutputWriter(open(output_file_path, "ab" if append else "wb", buffering=0), encoding, eol,
+                                       buffer_size)
+    if append and output_file.raw_file.tell() > 0:
+        # like a text file opened in append mode, no byte order mark in the middle of the file
+        output_file.encoder.setstate(0)
+    return output_file
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+from target_mako.logger import get_logger
+from target_mako.output_files import OutputFilePattern, get_abs_path, load_config_for_stream, open_output_file, \
+    render_footer_and_close, render_template
+
+LOGGER = get_logger()
+
+DEFAULT_MAX_OPEN_FILES = 100
+
+
+#
+# Output files of a "partition_output_files" template: "output_file_name" uses record fields ("{country}/{date}.csv")
+# and the records with the same values are appended to the same file.
+# Each file gets its header from its first record and its footer from its last record at the end of the run.
+# At most "max_open_files" files are open, the least recently used one is closed and reopened later if needed.
+#
+class PartitionedOutputFiles(object):
+    def __init__(self, config, templates, stream):
+        self.config = config
+        self.templates = templates
+        self.stream = stream
+        self.max_open_files = templates.get('max_open_files') or DEFAULT_MAX_OPEN_FILES
+        self.atomic_output = load_config_for_stream(config, 'atomic_output', stream)
+        output_dir = load_config_for_stream(config, 'output_dir', stream)
+        self.output_file_pattern = OutputFilePattern(get_abs_path(output_dir), templates['output_filename'])
+        # open files, least recently used first
+        self.open_files = OrderedDict()
+        # files that got their header
+        self.started_paths = set()
+        # last record and schema values of each file, only kept for the footer
+        self.last_values = {}
+        # atomic output: temporary file of the closed files, reopened in append mode
+        self.temporary_paths = {}
+        self.closed = False
+
+    def render_record(self, record_dict, record_values, schema_values, rendering_functions):
+        output_file_path = self.output_file_pattern.format(record_dict)
+        output_file = self.get_output_file(output_file_path)
+        if output_file_path not in self.started_paths:
+            self.started_paths.add(output_file_path)
+            render_template(output_file, self.templates['header'], record_values, schema_values, rendering_functions)
+        render_template(output_file, self.templates['line'], record_values, schema_values, rendering_functions)
+        if self.templates['footer'] is not None:
+            self.last_values[output_file_path] = (record_values, schema_values)
+
+    def get_output_file(self, output_file_path):
+        output_file = self.open_files.pop(output_file_path, None)
+        if output_file is None:
+            if len(self.open_files) >= self.max_open_files:
+                least_recently_used_path, least_recently_used_file = self.open_files.popitem(last=False)
+                if self.atomic_output:
+                    # not renamed before its footer is written
+                    least_recently_used_file.close_temporary()
+                    self.temporary_paths[least_recently_used_path] = least_recently_used_file.temporary_path
+                else:
+                    least_recently_used_file.close()
+            # a file already started is reopened in append mode
+            output_file = open_output_file(self.config, output_file_path, self.templates, self.stream,
+                                           append=output_file_path in self.started_paths,
+                                           temporary_path=self.temporary_paths.pop(output_file_path, None))
+        self.open_files[output_file_path] = output_file
+        return output_file
+
+    def flush(self):
+        for output_file in self.open_files.values():
+            output_file.flush()
+
+    def render_footers_and_close(self, rendering_functions):
+        # closed files are reopened for their footer, or to be renamed by the atomic output
+        if self.templates['footer'] is not None:
+            for output_file_path, (record_values, schema_values) in self.last_values.items():
+                output_file = self.get_output_file(output_file_path)
+                render_footer_and_close(output_file, record_values, schema_values, self.templates,
+                                        rendering_functions)
+                del self.open_files[output_file_path]
+        elif self.atomic_output:
+            for output_file_path in self.started_paths:
+                self.get_output_file(output_file_path).close()
+                del self.open_files[output_file_path]
+        self.close()
+        LOGGER.info("{} files written for {}".format(len(self.started_paths), self.templates['output_filename']))
+
+    def close(self):
+        for output_file in self.open_files.values():
+            output_file.close()
+        self.open_files.clear()
+        self.closed = True
@@ -0,0 +1,168 @@
+import time
+from collections import deque
+
+from target_mako.dict_proxy import get_missing_attribute_report, lazy_namespace, set_missing_attribute_report
+from target_mako.logger import get_logger
+from target_mako.metrics import DEFAULT_METRICS_INTERVAL_SECONDS, get_metrics, set_metrics
+
+LOGGER = get_logger()
+
+# templates and validator of the stream rendered by the current pool process
+_RENDER_PROCESS = {}
+
+
+#
+# Renders the records of one stream in a pool of processes.
+# Records are sent by chunks, rendered chunks are written back in the original order
+# so the output files are the same as with a sequential run.
+#
+class RecordRenderPool(object):
+    def __init__(self, config, stream, processes, chunk_size=1000):
+        from concurrent.futures import ProcessPoolExecutor
+
+        LOGGER.info("Starting {} render processes for stream : {}".format(processes, stream))
+        self.config = config
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_pending_chunks = processes * 2
+        self.executor = ProcessPoolExecutor(processes, initializer=init_render_process, initargs=(config, stream))
+        self.template_list = None
+        self.output_file_list = None
+        self.schema = None
+        self.first_index = 0
+        self.records = []
+        self.pending_chunks = deque()
+
+    def set_output(self, schema, template_list, output_file_list):
+        from target_mako import renders_records
+
+        for templates in template_list:
+            if renders_records(templates):
+                raise Exception("partition_output_files, max_records_per_file, max_bytes_per_file, "
+                                "records_per_render and columnar templates are not supported with "
+                                "render_processes, stream : " + self.stream)
+        # the records already received are rendered with the previous schema and written in the previous files
+        self.flush()
+        self.schema = schema
+        self.template_list = template_list
+        self.output_file_list = output_file_list
+
+    def submit(self, line_index, record_dict):
+        if not self.records:
+            self.first_index = line_index
+        self.records.append(record_dict)
+        if len(self.records) >= self.chunk_size:
+            self.submit_chunk()
+
+    def submit_chunk(self):
+        if not self.records:
+            return
+        future = self.executor.submit(render_record_chunk, self.schema, self.first_index, self.records)
+        self.pending_chunks.append((self.first_index, self.records, future))
+        self.records = []
+        while len(self.pending_chunks) > self.max_pending_chunks:
+            self.write_chunk(*self.pending_chunks.popleft())
+
+    def write_chunk(self, first_index, records, future):
+        from target_mako import get_or_open_file_for_template
+
+        rendered_records, counts, metrics_counts = future.result()
+        if counts:
+            get_missing_attribute_report().merge(counts)
+        if metrics_counts:
+            get_metrics().merge(metrics_counts)
+        for line_index, record_dict in enumerate(records, first_index):
+            # same processing values as the copy rendered by the pool process
+            record_dict['record_index'] = line_index
+            record_dict['record_number'] = line_index + 1
+        for record_dict, rendered_templates in zip(records, rendered_records):
+            for templates, rendered in zip(self.template_list, rendered_templates):
+                one_file_per_record = templates['one_file_per_record']
+                output_file = get_or_open_file_for_template(self.config, one_file_per_record, self.output_file_list,
+                                                            record_dict, templates, self.stream)
+                output_file.write(rendered)
+                if one_file_per_record:
+                    output_file.close()
+
+    def flush(self):
+        self.submit_chunk()
+        while self.pending_chunks:
+            self.write_chunk(*self.pending_chunks.popleft())
+
+    def close(self):
+        # pending chunks are only written by flush, on errors they are dropped
+        # (shutdown(cancel_futures=True) needs python 3.9)
+        for _, _, future in self.pending_chunks:
+            future.cancel()
+        self.pending_chunks.clear()
+        self.executor.shutdown()
+
+
+class RenderedText(object):
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def close(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.chunks)
+
+
+def init_render_process(config, stream):
+    from target_mako import load_template_list_from_config
+    from target_mako.formatting_functions import DEFAULT_DATE_FORMAT_CACHE_SIZE, configure_date_format_cache, \
+        create_rendering_functions
+
+    set_missing_attribute_report(config.get('missing_attribute_report', 'aggregate'))
+    set_metrics(config.get('metrics', False),
+                config.get('metrics_interval_seconds', DEFAULT_METRICS_INTERVAL_SECONDS))
+    # templates are compiled once in cache_template_dir and loaded from there by the other processes
+    _RENDER_PROCESS['config'] = config
+    _RENDER_PROCESS['stream'] = stream
+    _RENDER_PROCESS['templates'] = load_template_list_from_config(config, stream)
+    configure_date_format_cache(config.get('date_format_cache_size', DEFAULT_DATE_FORMAT_CACHE_SIZE))
+    _RENDER_PROCESS['rendering_functions'] = create_rendering_functions()
+    _RENDER_PROCESS['schema'] = None
+
+
+def render_record_chunk(schema, first_index, records):
+    from target_mako import load_record_validator, render_templates_for_record
+
+    if _RENDER_PROCESS['schema'] != schema:
+        _RENDER_PROCESS['schema'] = schema
+        _RENDER_PROCESS['validator'] = load_record_validator(_RENDER_PROCESS['config'], _RENDER_PROCESS['stream'],
+                                                             schema)
+        _RENDER_PROCESS['schema_values'] = lazy_namespace(schema, 'schema')
+    validator = _RENDER_PROCESS['validator']
+    schema_values = _RENDER_PROCESS['schema_values']
+    rendering_functions = _RENDER_PROCESS['rendering_functions']
+    missing_attribute_report = get_missing_attribute_report()
+    missing_attribute_report.set_stream(_RENDER_PROCESS['stream'])
+    metrics = get_metrics()
+    if metrics.enabled:
+        metrics.set_stream(_RENDER_PROCESS['stream'])
+    rendered_records = []
+    for line_index, record_dict in enumerate(records, first_index):
+        if metrics.enabled:
+            start = time.perf_counter()
+        validator.validate(record_dict)
+        if metrics.enabled:
+            validated = time.perf_counter()
+        record_dict['record_index'] = line_index
+        record_dict['record_number'] = line_index + 1
+        record_values = lazy_namespace(record_dict, 'record')
+        if metrics.enabled:
+            metrics.add_record(_RENDER_PROCESS['stream'], validated - start, time.perf_counter() - validated)
+        rendered_templates = []
+        for templates in _RENDER_PROCESS['templates']:
+            rendered = RenderedText()
+            render_templates_for_record(line_index, templates['one_file_per_record'], rendered, record_values,
+                                        schema_values, templates, rendering_functions)
+            rendered_templates.append(rendered.getvalue())
+        rendered_records.append(rendered_templates)
+    return rendered_records, dict(missing_attribute_report.take_counts()), \
+        metrics.take_counts() if metrics.enabled else None
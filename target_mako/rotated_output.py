@@ -0,0 +1,89 @@
+from target_mako.logger import get_logger
+from target_mako.output_files import OutputFilePattern, get_abs_path, load_config_for_stream, open_output_file, \
+    render_footer_and_close, render_template
+from target_mako.output_writer import DEFAULT_EOL
+
+LOGGER = get_logger()
+
+PART_FIELD = 'part'
+
+
+#
+# Output file of a template written in several parts: a new part is started once the current one has
+# "max_records_per_file" records or "max_bytes_per_file" bytes. The "{part}" field of "output_file_name" is replaced
+# by the part number (starting at 1). Each part gets its header from its first record and its footer from its
+# last record.
+#
+class RotatedOutputFile(object):
+    def __init__(self, config, templates, stream):
+        output_filename = templates['output_filename']
+        if '{' + PART_FIELD not in output_filename:
+            raise Exception("output_file_name {} must contain the {{part}} field with max_records_per_file or "
+                            "max_bytes_per_file".format(output_filename))
+        self.config = config
+        self.templates = templates
+        self.stream = stream
+        self.max_records = templates.get('max_records_per_file')
+        self.max_bytes = templates.get('max_bytes_per_file')
+        self.encoding = templates.get('output_file_encoding', "utf8")
+        eol = templates.get('output_file_EOL', DEFAULT_EOL)
+        # characters added by the end of line translation
+        self.extra_eol_bytes = len(eol) - 1 if eol else 0
+        output_dir = load_config_for_stream(config, 'output_dir', stream)
+        self.output_file_pattern = OutputFilePattern(get_abs_path(output_dir), output_filename)
+        self.part = 0
+        self.output_file = None
+        self.records = 0
+        self.bytes = 0
+        self.last_values = None
+        self.closed = False
+
+    def render_record(self, record_dict, record_values, schema_values, rendering_functions):
+        if self.output_file is not None and self.is_full():
+            self.render_footer_and_close_part(rendering_functions)
+        if self.output_file is None:
+            self.open_next_part()
+            render_template(self, self.templates['header'], record_values, schema_values, rendering_functions)
+        render_template(self, self.templates['line'], record_values, schema_values, rendering_functions)
+        self.records += 1
+        self.last_values = (record_values, schema_values)
+
+    def is_full(self):
+        if self.max_records and self.records >= self.max_records:
+            return True
+        if self.max_bytes and self.bytes >= self.max_bytes:
+            return True
+        return False
+
+    def open_next_part(self):
+        self.part += 1
+        output_file_path = self.output_file_pattern.format({PART_FIELD: self.part})
+        self.output_file = open_output_file(self.config, output_file_path, self.templates, self.stream)
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, text):
+        if self.max_bytes:
+            self.bytes += len(text.encode(self.encoding)) + text.count('\n') * self.extra_eol_bytes
+        return self.output_file.write(text)
+
+    def render_footer_and_close_part(self, rendering_functions):
+        record_values, schema_values = self.last_values
+        # the footer is written through this object, render_footer_and_close closes the part
+        render_footer_and_close(self, record_values, schema_values, self.templates, rendering_functions)
+
+    def flush(self):
+        if self.output_file is not None:
+            self.output_file.flush()
+
+    def render_footers_and_close(self, rendering_functions):
+        if self.output_file is not None:
+            self.render_footer_and_close_part(rendering_functions)
+        self.closed = True
+        LOGGER.info("{} parts written for {}".format(self.part, self.templates['output_filename']))
+
+    def close(self):
+        # closes the current part only, the next record opens a new part
+        if self.output_file is not None:
+            self.output_file.close()
+            self.output_file = None
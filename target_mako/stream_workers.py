@@ -0,0 +1,211 @@
+import multiprocessing
+import queue
+import threading
+import traceback
+
+from target_mako.checkpoint import create_state_checkpoint
+from target_mako.dict_proxy import get_missing_attribute_report, set_missing_attribute_report
+from target_mako.logger import get_logger
+from target_mako.metrics import DEFAULT_METRICS_INTERVAL_SECONDS, get_metrics, set_metrics
+
+LOGGER = get_logger()
+
+STREAM_WORKER_MODES = ('thread', 'process')
+
+# internal message asking a stream worker to flush its output files
+FLUSH_OUTPUTS = 'FLUSH_OUTPUTS'
+
+# seconds between two checks that a worker process is still running while waiting for it
+WORKER_CHECK_SECONDS = 1
+
+
+def persist_messages_in_stream_workers(config, messages, persist_messages):
+    from target_mako import emit_state
+
+    mode = config['stream_workers']
+    if mode not in STREAM_WORKER_MODES:
+        raise Exception("Unknown stream_workers value {}, expected one of {}".format(mode, STREAM_WORKER_MODES))
+    queue_size = config.get('stream_worker_queue_size', 1000)
+    workers = {}
+    state = None
+    state_checkpoint = create_state_checkpoint(config)
+    try:
+        for o in messages:
+            t = o['type']
+            if t == 'RECORD' or t == 'SCHEMA':
+                stream = o['stream']
+                if stream not in workers:
+                    LOGGER.info("Starting {} worker for stream : {}".format(mode, stream))
+                    workers[stream] = StreamWorker(config, stream, persist_messages, mode, queue_size)
+                workers[stream].submit(o)
+                if t == 'RECORD':
+                    state = None
+                    if state_checkpoint is not None:
+                        state_checkpoint.records += 1
+            elif t == 'STATE':
+                LOGGER.debug('Setting state to {}'.format(o['value']))
+                state = o['value']
+                if state_checkpoint is not None and state_checkpoint.is_due():
+                    # all the records received before the state must be written by the workers first
+                    flush_stream_workers(workers)
+                    emit_state(state)
+                    state_checkpoint.emitted()
+            else:
+                raise Exception("Unknown message type {} in message {}"
+                                .format(o['type'], o))
+    except Exception:
+        # stop the workers, the original error is the one to report
+        for worker in workers.values():
+            try:
+                worker.finish()
+            except Exception:
+                pass
+        raise
+    # the state is returned (and emitted) only once every worker has written all its records
+    finish_stream_workers(workers)
+    return state
+
+
+def flush_stream_workers(workers):
+    for worker in workers.values():
+        worker.request_flush()
+    for worker in workers.values():
+        worker.wait_flushed()
+
+
+def finish_stream_workers(workers):
+    errors = []
+    for worker in workers.values():
+        try:
+            worker.finish()
+        except Exception as exc:
+            errors.append(exc)
+    if errors:
+        raise errors[0]
+
+
+#
+# Renders all the messages of one stream: the worker owns the stream templates, validator and output files.
+# Messages are processed in order by persist_messages, in a thread or in a child process.
+#
+class StreamWorker(object):
+    def __init__(self, config, stream, persist_messages, mode='thread', queue_size=1000):
+        self.stream = stream
+        self.mode = mode
+        self.error = None
+        self.finished = False
+        if mode == 'process':
+            self.messages = multiprocessing.Queue(queue_size)
+            self.flushes = multiprocessing.Queue()
+            self.results = multiprocessing.Queue(1)
+            self.failed = multiprocessing.Event()
+            self.worker = multiprocessing.Process(target=run_stream_worker_process,
+                                                  args=(config, persist_messages, self.messages, self.flushes,
+                                                        self.results, self.failed),
+                                                  name="target-mako-" + stream)
+        else:
+            self.messages = queue.Queue(queue_size)
+            self.flushes = queue.Queue()
+            self.worker = threading.Thread(target=self.run_stream_worker_thread,
+                                           args=(config, persist_messages),
+                                           name="target-mako-" + stream)
+        self.worker.start()
+
+    def submit(self, o):
+        if self.error is not None or (self.mode == 'process' and self.failed.is_set()):
+            self.finish()
+        self.put_message(o)
+
+    def request_flush(self):
+        self.submit({'type': FLUSH_OUTPUTS, 'stream': self.stream})
+
+    def wait_flushed(self):
+        if not self.get_answer(self.flushes):
+            # the worker failed before the flush
+            self.finish()
+
+    def finish(self):
+        if self.finished:
+            self.raise_error()
+            return
+        self.finished = True
+        self.put_message(None)
+        if self.mode == 'process':
+            error, counts, metrics_counts = self.get_answer(self.results)
+            self.worker.join()
+            if counts:
+                get_missing_attribute_report().merge(counts)
+            if metrics_counts:
+                get_metrics().merge(metrics_counts)
+            if error is not None:
+                self.error = Exception("Worker for stream {} failed:\n{}".format(self.stream, error))
+        else:
+            self.worker.join()
+        self.raise_error()
+
+    def put_message(self, o):
+        if self.mode != 'process':
+            self.messages.put(o)
+            return
+        # a killed process (out of memory, segfault) never reads the queue again
+        while True:
+            try:
+                self.messages.put(o, timeout=WORKER_CHECK_SECONDS)
+                return
+            except queue.Full:
+                self.check_worker_alive()
+
+    def get_answer(self, answers):
+        if self.mode != 'process':
+            return answers.get()
+        while True:
+            try:
+                return answers.get(timeout=WORKER_CHECK_SECONDS)
+            except queue.Empty:
+                if not self.worker.is_alive():
+                    break
+        # the answer may have been sent just before the process exited
+        try:
+            return answers.get(timeout=WORKER_CHECK_SECONDS)
+        except queue.Empty:
+            self.check_worker_alive()
+
+    def check_worker_alive(self):
+        if self.worker.is_alive():
+            return
+        self.finished = True
+        self.error = Exception("Worker for stream {} exited with code {}".format(self.stream, self.worker.exitcode))
+        raise self.error
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def run_stream_worker_thread(self, config, persist_messages):
+        try:
+            persist_messages(config, iter(self.messages.get, None), self.flushes.put)
+        except BaseException as exc:
+            self.error = exc
+            drain_messages(self.messages, self.flushes)
+
+
+def run_stream_worker_process(config, persist_messages, messages, flushes, results, failed):
+    missing_attribute_report = set_missing_attribute_report(config.get('missing_attribute_report', 'aggregate'))
+    # a forked process starts with the metrics of the main process, only its own counts are sent back
+    metrics = set_metrics(config.get('metrics', False),
+                          config.get('metrics_interval_seconds', DEFAULT_METRICS_INTERVAL_SECONDS))
+    try:
+        persist_messages(config, iter(messages.get, None), flushes.put)
+    except BaseException:
+        failed.set()
+        results.put((traceback.format_exc(), None, None))
+        drain_messages(messages, flushes)
+        return
+    results.put((None, dict(missing_attribute_report.counts), metrics.take_counts() if metrics.enabled else None))
+
+
+def drain_messages(messages, flushes):
+    # keep reading after an error so the main loop never blocks on a full queue or a flush
+    for o in iter(messages.get, None):
+        if o['type'] == FLUSH_OUTPUTS:
+            flushes.put(False)
@@ -0,0 +1,67 @@
+import threading
+
+from target_mako.logger import get_logger
+
+LOGGER = get_logger()
+
+
+#
+# Process-wide registry of template lookups keyed by (template_dir, cache_template_dir).
+# Loaded templates are kept for the whole run: a SCHEMA message sent again, or streams sharing the same
+# templates, get the already compiled Template objects without new file system checks.
+#
+class TemplateCache(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lookups = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_lookup(self, template_dir, cache_template_dir):
+        key = (template_dir, cache_template_dir)
+        with self.lock:
+            lookup = self.lookups.get(key)
+            if lookup is None:
+                lookup = SharedTemplateLookup(self, template_dir, cache_template_dir)
+                self.lookups[key] = lookup
+            return lookup
+
+    def log_stats(self):
+        LOGGER.info("Template cache: {} hits, {} misses".format(self.hits, self.misses))
+
+
+class SharedTemplateLookup(object):
+    def __init__(self, cache, template_dir, cache_template_dir):
+        from mako.lookup import TemplateLookup
+
+        self.cache = cache
+        # preprocessor is there to remove extra line inside generated content (On windows machines).
+        self.lookup = TemplateLookup(directories=[template_dir],
+                                     module_directory=cache_template_dir,
+                                     preprocessor=[lambda x: x.replace("\r\n", "\n")])
+        self.templates = {}
+
+    def get_template(self, name):
+        cache = self.cache
+        with cache.lock:
+            template = self.templates.get(name)
+            if template is not None:
+                cache.hits += 1
+                return template
+            cache.misses += 1
+            template = self.lookup.get_template(name)
+            self.templates[name] = template
+            return template
+
+
+_TEMPLATE_CACHE = TemplateCache()
+
+
+def get_template_cache():
+    return _TEMPLATE_CACHE
+
+
+def reset_template_cache():
+    global _TEMPLATE_CACHE
+    _TEMPLATE_CACHE = TemplateCache()
+    return _TEMPLATE_CACHE
@@ -0,0 +1,67 @@
+from target_mako.logger import get_logger
+
+LOGGER = get_logger()
+
+RECORD_VALIDATION_MODES = ('full', 'compiled', 'sample', 'off')
+
+DRAFT4_SCHEMA = "http://json-schema.org/draft-04/schema#"
+
+
+class RecordValidationError(Exception):
+    pass
+
+
+#
+# Validates the records of a stream against its schema.
+# modes:
+#   - full : every record is validated by jsonschema Draft4Validator
+#   - compiled : every record is validated by a validator generated once per schema (fastjsonschema)
+#   - sample : one record every "record_validation_sample_rate" records is validated by jsonschema
+#   - off : records are not validated
+#
+class RecordValidator(object):
+    def __init__(self, stream, schema, mode='full', sample_rate=100):
+        if mode not in RECORD_VALIDATION_MODES:
+            raise Exception("Unknown record_validation mode {}, expected one of {}"
+                            .format(mode, RECORD_VALIDATION_MODES))
+        self.stream = stream
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.record_count = 0
+        self.validate_record = None
+        if mode == 'compiled':
+            self.validate_record = compile_schema(stream, schema)
+            if self.validate_record is None:
+                self.mode = 'full'
+        if self.validate_record is None and self.mode != 'off':
+            from jsonschema.validators import Draft4Validator
+            self.validate_record = Draft4Validator(schema).validate
+
+    def validate(self, record):
+        self.record_count += 1
+        if self.mode == 'off':
+            return
+        if self.mode == 'sample' and (self.record_count - 1) % self.sample_rate != 0:
+            return
+        try:
+            self.validate_record(record)
+        except Exception as exc:
+            message = "Record {} of stream {} does not match the schema ({} validation): {}" \
+                .format(self.record_count, self.stream, self.mode, getattr(exc, 'message', exc))
+            LOGGER.error(message)
+            raise RecordValidationError(message) from exc
+
+
+def compile_schema(stream, schema):
+    try:
+        import fastjsonschema
+    except ImportError:
+        LOGGER.warning("record_validation 'compiled' needs the fastjsonschema package, using 'full' validation "
+                       "for stream : " + stream)
+        return None
+    if "$schema" not in schema:
+        # same draft as the full validation
+        schema = dict(schema, **{"$schema": DRAFT4_SCHEMA})
+    # no default values added to the records and no format checks, like Draft4Validator
+    return fastjsonschema.compile(schema, use_default=False, use_formats=False)
+
@@ -6,7 +6,8 @@ from mako.lookup import TemplateLookup
 
 from target_mako import get_abs_path, load_template_from_config, load_template_list_from_config, open_output_file_list, \
     render_templates_for_record, TemplateValues, render_footer_and_close, get_or_open_file_for_template, \
-    generate_output_file_path, load_config_for_stream
+    generate_output_file_path, load_config_for_stream, get_wrapped_schema, OutputFilePattern
+from target_mako.output_writer import BufferedOutputWriter, OneShotOutputWriter
 
 
 def test_load_config_for_stream():
@@ -232,6 +233,41 @@ def test_open_output_file_list_stream_specific():
     output_file_list["sample.csv"].close()
 
 
+def test_open_output_file_list_buffered():
+    # given
+    config = {
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "output_dir": "output",
+        "output_buffer_size": 65536,
+        "template_list": [
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "",
+                "output_file_name": "sample.csv"
+            },
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "",
+                "output_file_name": "sample2.csv",
+                "output_buffer_size": 0
+            }
+        ]
+    }
+    template_list = load_template_list_from_config(config, "my-stream")
+    # when
+    output_file_list = open_output_file_list(config, template_list, "my-stream")
+    # then
+    assert 2 == len(output_file_list)
+    assert isinstance(output_file_list["sample.csv"], BufferedOutputWriter)
+    assert 65536 == output_file_list["sample.csv"].buffer_size
+    assert isinstance(output_file_list["sample2.csv"], TextIOWrapper)
+    output_file_list["sample.csv"].close()
+    output_file_list["sample2.csv"].close()
+
+
 def prepare_data_for_rendering(config, stream):
     template_list = load_template_list_from_config(config, stream)
     templates = template_list[0]
@@ -511,6 +547,55 @@ def test_get_or_open_file_for_template_one_file():
     tested_file.close()
 
 
+def test_get_or_open_file_for_template_one_file_buffered():
+    # given
+    with tempfile.TemporaryDirectory() as output_dir:
+        config = {
+            "template_dir": "templates",
+            "cache_template_dir": "temp/mako_modules",
+            "output_dir": output_dir,
+            "output_buffer_size": 1024,
+            "template_list": [
+                {
+                    "header_template_name": "",
+                    "data_template_name": "json/sample.template.json",
+                    "footer_template_name": "",
+                    "output_file_name": "json/sample{id}.json",
+                    "one_file_per_record": True
+                }
+            ]
+        }
+        template_list = load_template_list_from_config(config, "my-stream")
+        templates = template_list[0]
+        # when
+        first_file = get_or_open_file_for_template(config, True, {}, {"id": 1}, templates, "my-stream")
+        first_file.write("first\n")
+        first_file.close()
+        second_file = get_or_open_file_for_template(config, True, {}, {"id": 2}, templates, "my-stream")
+        second_file.write("second\n")
+        second_file.close()
+        # then
+        assert isinstance(first_file, OneShotOutputWriter)
+        assert isinstance(templates["output_file_pattern"], OutputFilePattern)
+        with open(output_dir + "/json/sample1.json", "rb") as input_file:
+            assert b"first\r\n" == input_file.read()
+        with open(output_dir + "/json/sample2.json", "rb") as input_file:
+            assert b"second\r\n" == input_file.read()
+
+
+def test_output_file_pattern():
+    # given
+    record_dict = {"id": 7, "name": "Ward", "price": 12.5, "dimensions": {"width": 10}}
+    # when
+    simple_pattern = OutputFilePattern("output", "{name}/sample_{id:04d}_{missing}{{x}}.json")
+    nested_pattern = OutputFilePattern("output", "sample_{dimensions[width]}_{name!r}_{price:.{id}f}.json")
+    # then
+    assert simple_pattern.simple
+    assert "output/Ward/sample_0007_{x}.json" == simple_pattern.format(record_dict)
+    assert not nested_pattern.simple
+    assert "output/sample_10_'Ward'_12.5000000.json" == nested_pattern.format(record_dict)
+
+
 def test_generate_output_file_path_integer():
     # given
     config = {
@@ -573,3 +658,27 @@ def test_generate_output_file_path_no_key():
     # then
     assert result is not None
     assert result.endswith("output/sample.json")
+
+
+def test_get_wrapped_schema_cached():
+    # given
+    schema = {"properties": {"id": {"type": "integer"}}}
+    wrapped_schemas = {}
+    # when
+    first_schema_values = get_wrapped_schema(wrapped_schemas, "my-stream", schema)
+    second_schema_values = get_wrapped_schema(wrapped_schemas, "my-stream", schema)
+    # then
+    assert first_schema_values is second_schema_values
+    assert "my-stream" in wrapped_schemas
+    assert "integer" == first_schema_values.properties.id.type
+
+
+def test_get_wrapped_schema_no_cache():
+    # given
+    schema = {"properties": {"id": {"type": "integer"}}}
+    # when
+    first_schema_values = get_wrapped_schema(None, "my-stream", schema)
+    second_schema_values = get_wrapped_schema(None, "my-stream", schema)
+    # then
+    assert first_schema_values is not second_schema_values
+    assert "integer" == second_schema_values.properties.id.type
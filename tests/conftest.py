@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+# data template of the output files tests, options are added or replaced by each test
+TEMPLATE_CONFIG = {
+    "header_template_name": "header.txt",
+    "data_template_name": "line.txt",
+    "footer_template_name": "footer.txt",
+    "output_file_name": "sample.txt",
+    "output_file_EOL": "\n"
+}
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    # one directory per test, the compiled modules of templates with the same name are not shared between tests
+    path = tmp_path / "templates"
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    path = tmp_path / "output"
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def write_templates(template_dir):
+    def write(templates):
+        for name, text in templates.items():
+            with open(os.path.join(template_dir, name), "w") as template_file:
+                template_file.write(text)
+    return write
+
+
+@pytest.fixture
+def build_config(template_dir, output_dir):
+    def build(*template_configs, **options):
+        config = {
+            "disable_collection": True,
+            "template_dir": template_dir,
+            "cache_template_dir": template_dir + "/mako_modules",
+            "output_dir": output_dir,
+            "template_list": [dict(TEMPLATE_CONFIG, **template_config) for template_config in template_configs]
+        }
+        config.update(options)
+        return config
+    return build
+
+
+@pytest.fixture
+def stream_lines():
+    def lines(records, stream="my-stream"):
+        yield json.dumps({"type": "SCHEMA", "stream": "my-stream", "schema": {"type": "object"},
+                          "key_properties": ["id"]})
+        for record in records:
+            yield json.dumps({"type": "RECORD", "stream": stream, "record": record})
+        yield json.dumps({"type": "STATE", "stream": "my-stream", "value": {"bookmark": len(records)}})
+    return lines
+
+
+@pytest.fixture
+def read_file():
+    def read(path):
+        # the end of lines are kept as written
+        with open(path, encoding="utf8", newline="") as input_file:
+            return input_file.read()
+    return read
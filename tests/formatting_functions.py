@@ -1,5 +1,9 @@
+from datetime import datetime
+
+import pytest
+
 from target_mako.formatting_functions import format_json_date, fixed_size, null_safe, format_date, lower, upper, lfixed, \
-    nfixed, rfixed
+    nfixed, rfixed, configure_date_format_cache, parse_and_format_date
 
 
 def test_format_date():
@@ -37,6 +41,41 @@ def test_format_json_date():
     assert "28082020" == result
 
 
+def test_format_date_cache():
+    # given
+    date_format_cache = configure_date_format_cache(2)
+    # when
+    results = [format_json_date(json_date, '%d/%m/%Y') for json_date in ["2020-08-28", "2020-08-28", "2020-08-29",
+                                                                          "2020-08-30", "2020-08-28"]]
+    # then
+    assert ["28/08/2020", "28/08/2020", "29/08/2020", "30/08/2020", "28/08/2020"] == results
+    assert 1 == date_format_cache.format.cache_info().hits
+    assert 4 == date_format_cache.format.cache_info().misses
+    configure_date_format_cache()
+
+
+def test_format_json_date_iso_same_as_strptime():
+    # given
+    json_dates = ["2020-08-28", "2020-02-29", "0001-01-01", "9999-12-31", "2020-8-28", "2020-08-28T10:12:00",
+                  "20200828"]
+    output_date_format = '%d/%m/%Y %H:%M:%S %j %a'
+    # when
+    for json_date in json_dates:
+        # then
+        try:
+            expected = datetime.strptime(json_date, '%Y-%m-%d').strftime(output_date_format)
+        except ValueError:
+            with pytest.raises(ValueError):
+                parse_and_format_date(json_date, '%Y-%m-%d', output_date_format)
+        else:
+            assert expected == parse_and_format_date(json_date, '%Y-%m-%d', output_date_format)
+
+
+def test_format_json_date_invalid():
+    with pytest.raises(ValueError):
+        format_json_date("2020-02-30", '%d/%m/%Y')
+
+
 def test_fixed_size_smaller():
     # given
     json_string = "some content"
@@ -224,6 +263,37 @@ def test_nfixed_number():
     assert "0000000000000000000000000123.0" == result
 
 
+def test_nfixed_negative_number():
+    # given
+    json_number = -12
+    string_size = 5
+    # when
+    result = nfixed(json_number, string_size)
+    # then
+    assert "00-12" == result
+
+
+def test_fixed_functions_same_as_fixed_size():
+    # given
+    values = ["", "some content", "Wärd", 0, -12, 123.0, True, None]
+    # when
+    for value in values:
+        for string_size in [0, 1, 5, 30]:
+            # then
+            assert fixed_size(value, string_size) == lfixed(value, string_size)
+            assert fixed_size(value, string_size, "{:>") == rfixed(value, string_size)
+            assert fixed_size(value, string_size, "{:0>") == nfixed(value, string_size)
+
+
+def test_fixed_size_custom_format():
+    # given
+    json_string = "abc"
+    # when
+    result = fixed_size(json_string, 6, "{:*^")
+    # then
+    assert "*abc**" == result
+
+
 def test_null_safe_none():
     # given
     json_number = None
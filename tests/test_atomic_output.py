@@ -0,0 +1,98 @@
+import os
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako.output_writer import RenameBatch, create_rename_batch
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "first ${record.id}", "line.txt": "line ${record.id}",
+                     "footer.txt": "last ${record.id}"})
+
+
+@pytest.fixture
+def atomic_config(build_config):
+    def build(**options):
+        return build_config({"output_file_name": "sample.txt"},
+                            {"output_file_name": "records/sample{id}.txt", "one_file_per_record": True},
+                            {"output_file_name": "countries/sample_{country}.txt", "partition_output_files": True,
+                             "max_open_files": 1},
+                            atomic_output=True, **options)
+    return build
+
+
+def atomic_records(record_count):
+    return [{"id": index, "country": "fr" * (index % 2)} for index in range(1, record_count + 1)]
+
+
+def list_files(output_dir):
+    return sorted(os.path.relpath(os.path.join(directory, file_name), output_dir)
+                  for directory, _, file_names in os.walk(output_dir) for file_name in file_names)
+
+
+@pytest.mark.parametrize("options", [{}, {"output_buffer_size": 8}, {"output_write_threads": 2},
+                                     {"atomic_output_fsync_batch": 2}])
+def test_persist_lines_atomic_output(options, atomic_config, stream_lines, read_file, output_dir):
+    # given
+    config = atomic_config(**options)
+    # when
+    persist_lines(config, stream_lines(atomic_records(3)))
+    # then
+    assert ["countries/sample_.txt", "countries/sample_fr.txt", "records/sample1.txt", "records/sample2.txt",
+            "records/sample3.txt", "sample.txt"] == list_files(output_dir)
+    assert "first 1\nline 1\nline 2\nline 3\nlast 3\n" == read_file(output_dir + "/sample.txt")
+    assert "first 1\nline 1\nline 3\nlast 3\n" == read_file(output_dir + "/countries/sample_fr.txt")
+
+
+def test_persist_lines_atomic_output_failed_run(atomic_config, stream_lines, output_dir):
+    # given
+    config = atomic_config()
+    # when
+    with pytest.raises(Exception):
+        persist_lines(config, stream_lines(atomic_records(3), "unknown-stream"))
+    # then
+    temporary_files = list_files(output_dir)
+    assert 1 == len(temporary_files)
+    assert temporary_files[0].startswith("sample.txt.") and temporary_files[0].endswith(".tmp")
+
+
+@pytest.mark.parametrize("options", [{}, {"output_buffer_size": 8}, {"output_write_threads": 4},
+                                     {"atomic_output_fsync_batch": 10},
+                                     {"output_write_threads": 4, "atomic_output_fsync_batch": 10}])
+def test_persist_lines_atomic_output_same_file_name(options, build_config, stream_lines, read_file, output_dir):
+    # given
+    config = build_config({"output_file_name": "sample_{country}.txt", "one_file_per_record": True},
+                          atomic_output=True, **options)
+    # when
+    persist_lines(config, stream_lines(atomic_records(20)))
+    # then
+    assert ["sample_.txt", "sample_fr.txt"] == list_files(output_dir)
+    assert "first 19\nline 19\nlast 19\n" == read_file(output_dir + "/sample_fr.txt")
+    assert "first 20\nline 20\nlast 20\n" == read_file(output_dir + "/sample_.txt")
+
+
+def test_rename_batch():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        rename_batch = create_rename_batch({"atomic_output_fsync_batch": 3})
+        for index in range(2):
+            with open(output_dir + "/sample{}.txt.tmp".format(index), "w") as output_file:
+                output_file.write("sample")
+        # when
+        for index in range(2):
+            rename_batch.add(output_dir + "/sample{}.txt.tmp".format(index), output_dir + "/sample{}.txt".format(index))
+        # written again before the batch is renamed, the pending file is replaced
+        with open(output_dir + "/sample2.txt.tmp", "w") as output_file:
+            output_file.write("again")
+        rename_batch.add(output_dir + "/sample2.txt.tmp", output_dir + "/sample1.txt")
+        files_before_commit = list_files(output_dir)
+        rename_batch.commit()
+        # then
+        assert isinstance(rename_batch, RenameBatch)
+        assert ["sample0.txt.tmp", "sample2.txt.tmp"] == files_before_commit
+        assert ["sample0.txt", "sample1.txt"] == list_files(output_dir)
+        with open(output_dir + "/sample1.txt") as input_file:
+            assert "again" == input_file.read()
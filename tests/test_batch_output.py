@@ -0,0 +1,72 @@
+import pytest
+
+from target_mako import persist_lines
+
+# the same lines, rendered once per record or once per chunk of records
+LINE_TEMPLATE = "${record.id};${functions['lfixed'](record.name, 6)};${record.price / record.quantity}"
+BATCH_LINE_TEMPLATE = """% for record in records:
+${record.id};${functions['lfixed'](record.name, 6)};${record.price / record.quantity}
+% endfor
+"""
+
+RECORDS = [
+    {"id": 1, "name": "Wärd", "price": 12, "quantity": 3},
+    {"id": 2, "name": "a long name", "price": 5, "quantity": 2},
+    # division by zero, the line is not written
+    {"id": 3, "name": "zero", "price": 5, "quantity": 0},
+    {"id": 4, "name": None, "price": 1, "quantity": 4},
+    {"id": 5, "name": "last", "price": 9, "quantity": 1}
+]
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "HEADER ${record.id}", "line.txt": LINE_TEMPLATE,
+                     "batch_line.txt": BATCH_LINE_TEMPLATE, "footer.txt": "FOOTER ${record.id}"})
+
+
+@pytest.fixture
+def render(build_config, stream_lines, read_file, output_dir):
+    def render_records(template_config, records=RECORDS):
+        persist_lines(build_config(template_config), stream_lines(records))
+        return read_file(output_dir + "/sample.txt")
+    return render_records
+
+
+@pytest.mark.parametrize("records_per_render", [1, 2, 1000])
+def test_records_per_render_same_as_per_record_template(records_per_render, render):
+    # given
+    batch_config = {"data_template_name": "batch_line.txt", "records_per_render": records_per_render}
+    # when
+    per_record_output = render({})
+    batch_output = render(batch_config)
+    # then
+    assert per_record_output == batch_output
+    assert "HEADER 1\n1;Wärd  ;4.0\n2;a long;2.5\n4;      ;0.25\n5;last  ;9.0\nFOOTER 5\n" == batch_output
+
+
+def test_records_per_render_flushed_before_state(build_config, stream_lines, read_file, output_dir):
+    # given
+    config = build_config({"header_template_name": "", "data_template_name": "batch_line.txt",
+                           "footer_template_name": "", "records_per_render": 1000}, state_emit_every_records=1)
+    written_before_state = []
+
+    def lines():
+        for line in stream_lines(RECORDS[:2]):
+            yield line
+        # the state was processed, the pending records must be written
+        written_before_state.append(read_file(output_dir + "/sample.txt"))
+    # when
+    persist_lines(config, lines())
+    # then
+    assert ["1;Wärd  ;4.0\n2;a long;2.5\n"] == written_before_state
+
+
+def test_records_per_render_one_file_per_record(render):
+    # given
+    batch_config = {"data_template_name": "batch_line.txt", "records_per_render": 10, "one_file_per_record": True}
+    # when
+    with pytest.raises(Exception) as excinfo:
+        render(batch_config)
+    # then
+    assert "not supported with records_per_render" in str(excinfo.value)
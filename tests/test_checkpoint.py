@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako.checkpoint import StateCheckpoint, create_state_checkpoint
+
+
+def test_create_state_checkpoint_disabled():
+    assert create_state_checkpoint({}) is None
+
+
+def test_state_checkpoint_every_records():
+    # given
+    state_checkpoint = StateCheckpoint(every_records=2)
+    # when
+    state_checkpoint.records += 1
+    first_due = state_checkpoint.is_due()
+    state_checkpoint.records += 1
+    second_due = state_checkpoint.is_due()
+    state_checkpoint.emitted()
+    # then
+    assert not first_due
+    assert second_due
+    assert not state_checkpoint.is_due()
+
+
+def test_state_checkpoint_every_seconds():
+    # given
+    state_checkpoint = StateCheckpoint(every_seconds=0.000001)
+    state_checkpoint.last_emit_time -= 1
+    # then
+    assert state_checkpoint.is_due()
+
+
+def checked_lines(output_file_path, emitted_states):
+    yield json.dumps({"type": "SCHEMA", "stream": "my-stream", "schema": {"type": "object"}, "key_properties": ["id"]})
+    for index in range(6):
+        yield json.dumps({"type": "RECORD", "stream": "my-stream", "record": {"id": index, "tags": []}})
+        yield json.dumps({"type": "STATE", "stream": "my-stream", "value": {"bookmark": index}})
+        if index % 2 == 1:
+            # the state was emitted: the records before it are in the output file
+            with open(output_file_path, encoding="utf8") as input_file:
+                emitted_states.append(input_file.read().splitlines())
+
+
+@pytest.mark.parametrize("stream_workers", [None, "thread", "process"])
+def test_persist_lines_emit_state(stream_workers, capsys):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        config = {
+            "template_dir": "templates",
+            "cache_template_dir": "temp/mako_modules",
+            "output_dir": output_dir,
+            "state_emit_every_records": 2,
+            "fsync_output": True,
+            "template_list": [
+                {
+                    "header_template_name": "",
+                    "data_template_name": "csv/sample.template.csv",
+                    "footer_template_name": "",
+                    "output_file_name": "sample.csv",
+                    "output_file_EOL": "\n"
+                }
+            ]
+        }
+        if stream_workers:
+            config["stream_workers"] = stream_workers
+        written_lines_by_state = []
+        # when
+        state = persist_lines(config, checked_lines(output_dir + "/sample.csv", written_lines_by_state))
+        # then
+        emitted_states = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [{"bookmark": 1}, {"bookmark": 3}, {"bookmark": 5}] == emitted_states
+        assert {"bookmark": 5} == state
+        assert [2, 4, 6] == [len(written_lines) for written_lines in written_lines_by_state]
+
+
+@pytest.mark.parametrize("stream_workers", [None, "thread", "process"])
+def test_persist_lines_failed_flush(stream_workers):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        # the file cannot be written by the write pool when the outputs are flushed, a directory has the same name
+        os.makedirs(output_dir + "/sample.json")
+        config = {
+            "template_dir": "templates",
+            "cache_template_dir": "temp/mako_modules",
+            "output_dir": output_dir,
+            "state_emit_every_records": 1,
+            "output_write_threads": 2,
+            "template_list": [
+                {
+                    "header_template_name": "",
+                    "data_template_name": "json/sample.template.json",
+                    "footer_template_name": "",
+                    "output_file_name": "sample.json",
+                    "one_file_per_record": True
+                }
+            ]
+        }
+        if stream_workers:
+            config["stream_workers"] = stream_workers
+        lines = [json.dumps({"type": "SCHEMA", "stream": "my-stream", "schema": {"type": "object"},
+                             "key_properties": ["id"]}),
+                 json.dumps({"type": "RECORD", "stream": "my-stream", "record": {"id": 1, "tags": []}}),
+                 json.dumps({"type": "STATE", "stream": "my-stream", "value": {"bookmark": 1}})]
+        # when
+        with pytest.raises(Exception) as excinfo:
+            persist_lines(config, iter(lines))
+        # then
+        assert "Unable to write output file" in str(excinfo.value)
@@ -0,0 +1,114 @@
+import pytest
+
+from target_mako import persist_lines
+from target_mako.dict_proxy import get_missing_attribute_report
+
+COLUMNS = [
+    {"field": "id"},
+    {"field": "name", "function": "lfixed", "width": 8},
+    {"field": "price", "function": "rfixed", "width": 7},
+    {"field": "quantity", "function": "nfixed", "width": 4},
+    {"field": "checked"},
+    {"field": "dimensions.height"},
+    {"field": "created", "function": "format_json_date", "arguments": ["%d/%m/%Y"]},
+    {"field": "color", "function": "upper"},
+    {"field": "tags"},
+    {"field": "record_number"}
+]
+
+# the Mako data template giving the same lines as COLUMNS
+LINE_TEMPLATE = ";".join([
+    "${record.id}",
+    "${functions['lfixed'](record.name, 8)}",
+    "${functions['rfixed'](record.price, 7)}",
+    "${functions['nfixed'](record.quantity, 4)}",
+    "${record.checked}",
+    "${record.dimensions.height}",
+    "${functions['format_json_date'](record.created, '%d/%m/%Y')}",
+    "${functions['upper'](record.color)}",
+    "${record.tags}",
+    "${record.record_number}"
+])
+
+RECORDS = [
+    {"id": 1, "name": "Wärdrobe", "price": 12.5, "quantity": 3, "checked": True, "dimensions": {"height": 10},
+     "created": "2020-08-28", "color": "red", "tags": ["a", "b"]},
+    {"id": 2, "name": "a very long name", "price": None, "quantity": -2, "checked": False, "dimensions": None,
+     "created": "", "color": None, "tags": []},
+    {"id": 3, "name": "", "price": 1, "dimensions": {}, "created": "2020-02-29", "color": "Blue"},
+    # the height cannot be read, the line is not written
+    {"id": 4, "name": "x", "dimensions": 5, "created": "2020-08-28"},
+    # invalid date, the line is not written
+    {"id": 5, "name": "y", "dimensions": {"height": 2.0}, "created": "2020-02-30"},
+    {"id": 6, "name": "z", "dimensions": {"height": 3}, "created": "2021-01-01", "color": "green", "tags": [1]}
+]
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "HEADER ${record.id}", "line.txt": LINE_TEMPLATE,
+                     "footer.txt": "FOOTER ${record.id}"})
+
+
+@pytest.fixture
+def render(build_config, stream_lines, read_file, output_dir):
+    def render_records(template_config, records=RECORDS):
+        persist_lines(build_config(template_config), stream_lines(records))
+        return read_file(output_dir + "/sample.txt"), get_missing_attribute_report().counts
+    return render_records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_columnar_template_same_as_mako(chunk_size, render):
+    # given
+    columnar_config = {"template_type": "columnar", "columns": COLUMNS, "column_separator": ";",
+                       "columnar_chunk_size": chunk_size}
+    # when
+    mako_output, _ = render({})
+    columnar_output, _ = render(columnar_config)
+    # then
+    assert mako_output == columnar_output
+    assert columnar_output.startswith("HEADER 1\n1;Wärdrobe;   12.5;0003;True;10;28/08/2020;RED;['a', 'b'];1\n")
+    assert columnar_output.endswith("\nFOOTER 6\n")
+    assert 6 == columnar_output.count("\n")
+
+
+def test_columnar_template_missing_attribute_report(render):
+    # given
+    # Mako stops reading the record at the first error, only the valid records are compared
+    records = [record for record in RECORDS if record["id"] not in (4, 5)]
+    columnar_config = {"template_type": "columnar", "columns": COLUMNS, "column_separator": ";"}
+    # when
+    _, mako_counts = render({}, records)
+    _, columnar_counts = render(columnar_config, records)
+    # then
+    assert {key[2:]: count for key, count in mako_counts.items()} == \
+        {key[2:]: count for key, count in columnar_counts.items()}
+
+
+def test_columnar_template_unknown_function(render):
+    # given
+    columnar_config = {"template_type": "columnar", "columns": [{"field": "id", "function": "unknown"}]}
+    # when
+    with pytest.raises(Exception) as excinfo:
+        render(columnar_config)
+    # then
+    assert "Unknown function unknown for column id" in str(excinfo.value)
+
+
+def test_columnar_template_one_file_per_record(render):
+    # given
+    columnar_config = {"template_type": "columnar", "columns": COLUMNS, "one_file_per_record": True}
+    # when
+    with pytest.raises(Exception) as excinfo:
+        render(columnar_config)
+    # then
+    assert "not supported with template_type columnar" in str(excinfo.value)
+
+
+def test_unknown_template_type(render):
+    # when
+    with pytest.raises(Exception) as excinfo:
+        render({"template_type": "numpy"})
+    # then
+    assert "Unknown template_type numpy" in str(excinfo.value)
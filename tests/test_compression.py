@@ -0,0 +1,99 @@
+import bz2
+import gzip
+import importlib.util
+import lzma
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako.compression import ParallelGzipWriter, check_output_compression, compress_data, \
+    open_compressed_file
+
+DECOMPRESS = {"gzip": gzip.decompress, "bz2": bz2.decompress, "xz": lzma.decompress}
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "ID;NAME", "line.txt": "${record.id};${record.name}", "footer.txt": "END"})
+
+
+@pytest.fixture
+def compressed_config(build_config):
+    def build(output_compression, **options):
+        single_file_config = {"output_file_name": "sample.csv.z", "output_file_encoding": "latin-1",
+                              "output_file_EOL": "\r\n", "output_compression": output_compression}
+        one_file_config = dict(single_file_config, output_file_name="sample{id}.csv.z", one_file_per_record=True)
+        return build_config(single_file_config, one_file_config, state_emit_every_records=2, **options)
+    return build
+
+
+def compressed_records(record_count):
+    return [{"id": index, "name": "Wärd"} for index in range(1, record_count + 1)]
+
+
+def read_compressed_file(path, compression):
+    with open(path, "rb") as input_file:
+        return DECOMPRESS[compression](input_file.read()).decode("latin-1")
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+@pytest.mark.parametrize("output_buffer_size", [None, 8])
+def test_persist_lines_compressed(compression, output_buffer_size, compressed_config, stream_lines, output_dir):
+    # given
+    config = compressed_config(compression, output_buffer_size=output_buffer_size)
+    # when
+    persist_lines(config, stream_lines(compressed_records(3)))
+    # then
+    assert "ID;NAME\r\n1;Wärd\r\n2;Wärd\r\n3;Wärd\r\nEND\r\n" == \
+        read_compressed_file(output_dir + "/sample.csv.z", compression)
+    assert "ID;NAME\r\n2;Wärd\r\nEND\r\n" == read_compressed_file(output_dir + "/sample2.csv.z", compression)
+
+
+def test_persist_lines_parallel_gzip(compressed_config, stream_lines, output_dir):
+    # given
+    config = compressed_config("gzip")
+    config["template_list"][0]["output_compression_threads"] = 2
+    # when
+    persist_lines(config, stream_lines(compressed_records(3)))
+    # then
+    assert "ID;NAME\r\n1;Wärd\r\n2;Wärd\r\n3;Wärd\r\nEND\r\n" == \
+        read_compressed_file(output_dir + "/sample.csv.z", "gzip")
+
+
+def test_parallel_gzip_writer():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        output_file_path = output_dir + "/sample.gz"
+        data = "".join("{};line {}\n".format(index, index * 7) for index in range(50000)).encode("utf8")
+        output_file = ParallelGzipWriter(open(output_file_path, "wb"), 3, block_size=4096)
+        # when
+        for start in range(0, len(data), 1000):
+            output_file.write(data[start:start + 1000])
+        output_file.flush()
+        output_file.close()
+        output_file.close()
+        appended_file = open_compressed_file(output_file_path, "gzip", threads=2, append=True)
+        appended_file.write(b"appended\n")
+        appended_file.close()
+        # then
+        with gzip.open(output_file_path, "rb") as input_file:
+            assert data + b"appended\n" == input_file.read()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compress_data(compression):
+    assert b"ID;NAME\r\n" == DECOMPRESS[compression](compress_data(b"ID;NAME\r\n", compression, 1))
+
+
+def test_check_output_compression_unknown():
+    with pytest.raises(Exception) as excinfo:
+        check_output_compression("zip")
+    assert "Unknown output_compression zip" in str(excinfo.value)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("zstandard") is not None, reason="zstandard is installed")
+def test_check_output_compression_zstd_not_installed():
+    with pytest.raises(Exception) as excinfo:
+        check_output_compression("zstd")
+    assert "the zstandard package is not installed" in str(excinfo.value)
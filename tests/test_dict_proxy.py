@@ -1,4 +1,10 @@
-from target_mako.dict_proxy import wrap_namespace
+import json
+import tempfile
+
+import pytest
+
+from target_mako.dict_proxy import wrap_namespace, lazy_namespace, LazyList, set_missing_attribute_report, \
+    MissingAttributeReport
 
 
 def test_access_attribute():
@@ -116,3 +122,221 @@ def test_access_inner_invalid4_attribute():
     # then
     assert record_values.tags[1] is not None
     assert str(record_values.tags[1]) == ""
+
+
+def test_lazy_access_attribute():
+    # given
+    record_dict = {
+        "checked": True,
+        "dimensions": {
+            "width": 20,
+            "height": 40
+        },
+        "tags": ["rNEZGFXulwhyahOLnDEKRYAzbvHvkMRLsBSMxMxRRFkVhrvPoTeTgl", "CFEpSHIrsQRhQArc"],
+        "inner": [
+            {"key1": "value1"},
+            {"key1": "value2"}
+        ]
+    }
+    # when
+    record_values = lazy_namespace(record_dict)
+    # then
+    assert record_values.checked is True
+    assert 20 == record_values.dimensions.width
+    assert 40 == record_values.dimensions.height
+    assert "rNEZGFXulwhyahOLnDEKRYAzbvHvkMRLsBSMxMxRRFkVhrvPoTeTgl" == record_values.tags[0]
+    assert 2 == len(record_values.tags)
+    assert ["rNEZGFXulwhyahOLnDEKRYAzbvHvkMRLsBSMxMxRRFkVhrvPoTeTgl", "CFEpSHIrsQRhQArc"] == list(record_values.tags)
+    assert "value1" == record_values.inner[0].key1
+    assert ["value1", "value2"] == [inner.key1 for inner in record_values.inner]
+
+
+def test_lazy_access_invalid_attribute():
+    # given
+    record_dict = {
+        "checked": True,
+        "dimensions": None,
+        "inner": [
+            None,
+            {"key1": "value2"}
+        ]
+    }
+    # when
+    record_values = lazy_namespace(record_dict)
+    # then
+    assert str(record_values.invalid) == ""
+    assert str(record_values.invalid.width) == ""
+    assert str(record_values.dimensions.width) == ""
+    assert str(record_values.inner[0]) == ""
+    assert str(record_values.inner[0].key1) == ""
+    assert "value2" == record_values.inner[1].key1
+
+
+def test_lazy_does_not_copy_record():
+    # given
+    record_dict = {
+        "dimensions": {
+            "width": 20
+        },
+        "tags": ["a", "b"]
+    }
+    record_values = lazy_namespace(record_dict)
+    # when
+    record_dict["record_index"] = 3
+    record_dict["dimensions"]["width"] = 30
+    # then
+    assert 3 == record_values.record_index
+    assert 30 == record_values.dimensions.width
+    assert isinstance(record_values.tags, LazyList)
+    assert ["b"] == record_values.tags[1:]
+
+
+def test_lazy_protocol_attributes_are_not_values():
+    # given
+    record_dict = {
+        "checked": True
+    }
+    # when
+    record_values = lazy_namespace(record_dict)
+    # then
+    assert not hasattr(record_values, "__html__")
+
+
+def test_lazy_children_are_wrapped_once():
+    # given
+    record_dict = {
+        "dimensions": {
+            "tags": ["a", "b"]
+        },
+        "tags": ["a", "b"]
+    }
+    record_values = lazy_namespace(record_dict)
+    # when
+    tags = record_values.tags
+    nested_tags = record_values.dimensions.tags
+    # then
+    assert tags is record_values.tags
+    assert nested_tags is record_values.dimensions.tags
+    record_dict["tags"] = ["c"]
+    assert ["c"] == record_values.tags
+
+
+def test_lazy_vars_is_a_read_only_view():
+    # given
+    record_dict = {
+        "checked": True,
+        "dimensions": {
+            "width": 20
+        }
+    }
+    # when
+    record_values = lazy_namespace(record_dict)
+    # then
+    assert record_dict == vars(record_values)
+    assert record_dict == record_values.__dict__
+    assert {"width": 20} == vars(record_values)["dimensions"]
+    with pytest.raises(TypeError):
+        vars(record_values)["checked"] = False
+
+
+def test_lazy_list_is_a_list():
+    # given
+    record_dict = {
+        "tags": ["a", "b"],
+        "inner": [None, {"key1": "value1"}]
+    }
+    # when
+    record_values = lazy_namespace(record_dict)
+    # then
+    assert isinstance(record_values.tags, list)
+    assert '["a", "b"]' == json.dumps(record_values.tags)
+    assert "a,b" == ",".join(record_values.tags)
+    assert "b" in record_values.tags
+    assert str(record_values.inner[0].key1) == ""
+    assert ["", "value1"] == [str(inner.key1) for inner in record_values.inner]
+
+
+def test_missing_attribute_report_aggregate():
+    # given
+    report = set_missing_attribute_report('aggregate')
+    report.set_stream("my-stream")
+    report.set_template("csv/sample.template.csv")
+    record_values = wrap_namespace({"checked": None})
+    lazy_record_values = lazy_namespace({"checked": None, "inner": [{"key1": None}]}, 'record')
+    # when
+    str(record_values.invalid)
+    str(lazy_record_values.invalid)
+    str(lazy_record_values.checked)
+    str(lazy_record_values.checked)
+    str(lazy_record_values.inner[0].key1)
+    set_missing_attribute_report('aggregate')
+    # then
+    assert 1 == report.counts[("my-stream", "csv/sample.template.csv", "invalid", "missing")]
+    assert 1 == report.counts[("my-stream", "csv/sample.template.csv", "record.invalid", "missing")]
+    assert 2 == report.counts[("my-stream", "csv/sample.template.csv", "record.checked", "null")]
+    assert 1 == report.counts[("my-stream", "csv/sample.template.csv", "record.inner[].key1", "null")]
+
+
+def test_missing_attribute_report_summary():
+    # given
+    report = set_missing_attribute_report('aggregate')
+    report.set_stream("my-stream")
+    report.set_template("csv/sample.template.csv")
+    lazy_record_values = lazy_namespace({"dimensions": {"width": None}}, 'record')
+    str(lazy_record_values.dimensions.width)
+    str(lazy_record_values.dimensions.width)
+    str(lazy_record_values.dimensions.height)
+    set_missing_attribute_report('aggregate')
+    # when
+    summary = report.summary()
+    # then
+    assert 2 == len(summary)
+    assert {"stream": "my-stream", "template": "csv/sample.template.csv", "attribute": "record.dimensions.width",
+            "kind": "null", "count": 2} == summary[0]
+    assert {"stream": "my-stream", "template": "csv/sample.template.csv", "attribute": "record.dimensions.height",
+            "kind": "missing", "count": 1} == summary[1]
+
+
+def test_missing_attribute_report_chained_through_null():
+    # given
+    report = set_missing_attribute_report('aggregate')
+    lazy_record_values = lazy_namespace({"a": None, "inner": [None]}, 'record')
+    # when
+    str(lazy_record_values.a.b.c)
+    str(lazy_record_values.inner[0].key1.key2)
+    set_missing_attribute_report('aggregate')
+    # then
+    assert [("record.a", "null")] == [(row["attribute"], row["kind"]) for row in report.summary()]
+
+
+def test_missing_attribute_report_off():
+    # given
+    report = set_missing_attribute_report('off')
+    record_values = wrap_namespace({"checked": None})
+    # when
+    str(record_values.checked.invalid)
+    set_missing_attribute_report('aggregate')
+    # then
+    assert 0 == len(report.counts)
+
+
+def test_missing_attribute_report_unknown_mode():
+    with pytest.raises(Exception):
+        MissingAttributeReport('verbose')
+
+
+def test_missing_attribute_report_file():
+    # given
+    report = MissingAttributeReport('aggregate')
+    report.set_stream("my-stream")
+    report.set_template("csv/sample.template.csv")
+    report.missing("invalid")
+    with tempfile.TemporaryDirectory() as report_dir:
+        report_file = report_dir + "/report.json"
+        # when
+        report.emit_summary(report_file)
+        # then
+        with open(report_file, encoding="utf8") as input_file:
+            summary = json.load(input_file)
+    assert [{"stream": "my-stream", "template": "csv/sample.template.csv", "attribute": "invalid",
+             "kind": "missing", "count": 1}] == summary
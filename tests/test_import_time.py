@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+# regression budget for "import target_mako", the import of pkg_resources alone was more than 70 ms
+IMPORT_TIME_BUDGET_US = 120000
+
+# modules only needed by some runs or on errors, they are imported when used
+DEFERRED_MODULES = ['pkg_resources', 'singer', 'mako', 'jsonschema', 'fastjsonschema', 'http.client',
+                    'concurrent.futures']
+
+
+def run_python(*args):
+    return subprocess.run([sys.executable] + list(args), capture_output=True, text=True, check=True)
+
+
+def measure_import_time():
+    result = run_python('-X', 'importtime', '-c', 'import target_mako')
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == 'target_mako':
+            return int(fields[1])
+    raise AssertionError("target_mako not found in:\n" + result.stderr)
+
+
+def test_import_time_budget():
+    # given
+    # first import compiles the .pyc files
+    run_python('-c', 'import target_mako')
+    # when
+    import_time = min(measure_import_time() for _ in range(3))
+    # then
+    assert import_time < IMPORT_TIME_BUDGET_US
+
+
+def test_import_defers_heavy_modules():
+    # when
+    result = run_python('-c', 'import sys, target_mako; print(" ".join(sorted(sys.modules)))')
+    # then
+    imported_modules = result.stdout.split()
+    assert [] == [module for module in DEFERRED_MODULES if module in imported_modules]
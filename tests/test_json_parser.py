@@ -0,0 +1,76 @@
+import importlib
+import json
+import math
+
+import pytest
+
+from target_mako import parse_lines
+from target_mako.json_parser import load_json_parser, JSON_PARSERS
+
+
+def test_load_json_parser_json():
+    # when
+    json_parser, json_loads = load_json_parser('json')
+    # then
+    assert 'json' == json_parser
+    assert json.loads == json_loads
+
+
+def test_load_json_parser_auto():
+    # when
+    json_parser, json_loads = load_json_parser('auto')
+    # then
+    assert json_parser in JSON_PARSERS
+    assert {"type": "RECORD", "value": "é"} == json_loads('{"type": "RECORD", "value": "é"}'.encode("utf8"))
+    assert {"type": "RECORD", "value": "é"} == json_loads('{"type": "RECORD", "value": "é"}')
+
+
+def test_load_json_parser_fallback():
+    # given
+    json_parser, json_loads = load_json_parser('auto')
+    # when
+    o = json_loads(b'{"value": NaN}')
+    # then
+    assert math.isnan(o["value"])
+
+
+def test_load_json_parser_unknown():
+    with pytest.raises(Exception):
+        load_json_parser('yaml')
+
+
+def test_load_json_parser_not_installed(monkeypatch):
+    # given
+    def import_module(name):
+        raise ImportError(name)
+    monkeypatch.setattr(importlib, "import_module", import_module)
+    # then
+    with pytest.raises(Exception):
+        load_json_parser('ujson')
+    assert ('json', json.loads) == load_json_parser('auto')
+
+
+def test_parse_lines_bytes():
+    # given
+    lines = [b'{"type": "STATE", "stream": "my-stream", "value": {"bookmark": 1}}\n']
+    # when
+    messages = list(parse_lines(lines))
+    # then
+    assert [{"type": "STATE", "stream": "my-stream", "value": {"bookmark": 1}}] == messages
+
+
+def test_parse_lines_invalid():
+    # given
+    lines = [b'{"type": "STATE", "stream": \n']
+    # then
+    with pytest.raises(ValueError):
+        list(parse_lines(lines, load_json_parser('auto')[1]))
+
+
+def test_parse_lines_missing_type():
+    # given
+    lines = [b'{"stream": "my-stream"}\n']
+    # then
+    with pytest.raises(Exception) as exc_info:
+        list(parse_lines(lines))
+    assert "{\"stream\": \"my-stream\"}" in str(exc_info.value)
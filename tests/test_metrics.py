@@ -0,0 +1,125 @@
+import json
+import logging
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako.metrics import TemplateMetrics, get_metrics
+
+
+def metric_lines(record_count):
+    yield json.dumps({"type": "SCHEMA", "stream": "my-stream", "schema": {"type": "object"}, "key_properties": ["id"]})
+    for index in range(record_count):
+        yield json.dumps({"type": "RECORD", "stream": "my-stream", "record": {"id": index, "tags": ["a"]}})
+    yield json.dumps({"type": "STATE", "stream": "my-stream", "value": {"bookmark": record_count}})
+
+
+def build_config(output_dir, **options):
+    config = {
+        "disable_collection": True,
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [
+            {
+                "header_template_name": "json/sample_header.template.json",
+                "data_template_name": "json/sample.template.json",
+                "footer_template_name": "json/sample_footer.template.json",
+                "output_file_name": "sample.json"
+            }
+        ]
+    }
+    config.update(options)
+    return config
+
+
+def get_metric_logs(caplog):
+    return [json.loads(record.getMessage()[len("METRIC: "):]) for record in caplog.records
+            if record.getMessage().startswith("METRIC: ")]
+
+
+def test_template_metrics_percentile():
+    # given
+    template_metrics = TemplateMetrics()
+    # when
+    for index in range(99):
+        template_metrics.add_render(0.001, 0, 10)
+    template_metrics.add_render(0.1, 0, 10)
+    # then
+    assert 100 == template_metrics.renders
+    assert 1000 == template_metrics.bytes
+    assert 0.001 <= template_metrics.percentile(50) <= 0.00105
+    assert 0.001 <= template_metrics.percentile(99) <= 0.00105
+    assert 0.1 <= template_metrics.percentile(100) <= 0.105
+    assert TemplateMetrics().percentile(50) is None
+
+
+def test_persist_lines_with_metrics(caplog):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        caplog.set_level(logging.INFO)
+        metrics_file = output_dir + "/metrics.json"
+        config = build_config(output_dir, metrics=True, metrics_file=metrics_file)
+        # when
+        persist_lines(config, metric_lines(10))
+        # then
+        with open(metrics_file, encoding="utf8") as input_file:
+            summary = json.load(input_file)
+        assert 10 == summary["streams"]["my-stream"]["records"]
+        assert {"validate", "wrap", "render", "write"} == set(summary["streams"]["my-stream"]["stages"])
+        assert summary["parse_seconds"] > 0
+        templates = {template["template"]: template for template in summary["templates"]}
+        assert 10 == templates["json/sample.template.json"]["renders"]
+        assert 0 == templates["json/sample.template.json"]["errors"]
+        assert templates["json/sample.template.json"]["bytes_written"] > 0
+        assert templates["json/sample.template.json"]["render_latency_p99"] > 0
+        assert 1 == templates["json/sample_footer.template.json"]["renders"]
+        metric_logs = get_metric_logs(caplog)
+        assert {"type": "counter", "metric": "record_count", "value": 10, "tags": {"stream": "my-stream"}} \
+            in metric_logs
+
+
+@pytest.mark.parametrize("options", [{"stream_workers": "process"}, {"render_processes": 2}])
+def test_persist_lines_with_metrics_in_processes(options):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        metrics_file = output_dir + "/metrics.json"
+        config = build_config(output_dir, metrics=True, metrics_file=metrics_file, **options)
+        # when
+        persist_lines(config, metric_lines(10))
+        # then
+        with open(metrics_file, encoding="utf8") as input_file:
+            summary = json.load(input_file)
+        assert 10 == summary["streams"]["my-stream"]["records"]
+        assert {"validate", "wrap", "render", "write"} == set(summary["streams"]["my-stream"]["stages"])
+        templates = {template["template"]: template for template in summary["templates"]}
+        assert 10 == templates["json/sample.template.json"]["renders"]
+        assert templates["json/sample.template.json"]["bytes_written"] > 0
+        assert templates["json/sample.template.json"]["render_latency_p99"] > 0
+
+
+def test_persist_lines_emits_metrics_periodically(caplog):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        caplog.set_level(logging.INFO)
+        config = build_config(output_dir, metrics=True, metrics_interval_seconds=0)
+        # when
+        persist_lines(config, metric_lines(3))
+        # then
+        record_counts = [metric["value"] for metric in get_metric_logs(caplog) if metric["metric"] == "record_count"]
+        # emitted when each line is parsed, then at the end of the run
+        assert [1, 2, 3, 3] == record_counts
+
+
+def test_persist_lines_without_metrics(caplog):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        caplog.set_level(logging.INFO)
+        config = build_config(output_dir)
+        # when
+        persist_lines(config, metric_lines(3))
+        # then
+        assert not get_metrics().enabled
+        assert [] == get_metric_logs(caplog)
+        assert not get_metrics().records
@@ -0,0 +1,274 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from target_mako import flush_output_files, persist_lines
+from target_mako.output_writer import OneShotOutputWriter, OutputWritePool, WrittenFiles, create_output_write_pool, \
+    create_written_files, forget_output_directories, make_output_directory, open_buffered_output_writer, \
+    translate_eol
+
+
+def test_translate_eol():
+    assert "a\r\nb\r\n" == translate_eol("a\nb\n", "\r\n")
+    assert "a\nb\n" == translate_eol("a\nb\n", "")
+    assert "a\nb\n" == translate_eol("a\nb\n", "\n")
+
+
+def test_buffered_output_writer():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        output_file_path = output_dir + "/sample.csv"
+        output_file = open_buffered_output_writer(output_file_path, "utf8", "\r\n", 10)
+        # when
+        output_file.write("ID;NAME\n")
+        output_file.write("1;Wärd\n")
+        output_file.close()
+        # then
+        assert output_file.closed
+        with open(output_file_path, "rb") as input_file:
+            assert "ID;NAME\r\n1;Wärd\r\n".encode("utf8") == input_file.read()
+
+
+def test_buffered_output_writer_keeps_small_writes_in_memory():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        output_file_path = output_dir + "/sample.csv"
+        output_file = open_buffered_output_writer(output_file_path, "latin-1", "\n", 1024)
+        # when
+        output_file.write("1;Wärd\n")
+        # then
+        with open(output_file_path, "rb") as input_file:
+            assert b"" == input_file.read()
+        output_file.flush()
+        with open(output_file_path, "rb") as input_file:
+            assert "1;Wärd\n".encode("latin-1") == input_file.read()
+        output_file.close()
+
+
+def test_buffered_output_writer_writes_bom_once():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        output_file_path = output_dir + "/sample.csv"
+        output_file = open_buffered_output_writer(output_file_path, "utf-8-sig", "\n", 1)
+        # when
+        output_file.write("ID\n")
+        output_file.write("1\n")
+        output_file.close()
+        # then
+        with open(output_file_path, "rb") as input_file:
+            assert "ID\n1\n".encode("utf-8-sig") == input_file.read()
+
+
+def test_one_shot_output_writer():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        output_file_path = output_dir + "/sample.json"
+        output_file = OneShotOutputWriter(output_file_path, "utf8", "\r\n")
+        # when
+        output_file.write("{\n")
+        output_file.write("\"name\": \"Wärd\"}\n")
+        # then
+        assert not os.path.exists(output_file_path)
+        output_file.close()
+        output_file.close()
+        assert output_file.closed
+        with open(output_file_path, "rb") as input_file:
+            assert "{\r\n\"name\": \"Wärd\"}\r\n".encode("utf8") == input_file.read()
+
+
+def test_make_output_directory():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        directory = output_dir + "/a/b"
+        # when
+        make_output_directory(directory)
+        os.rmdir(directory)
+        make_output_directory(directory)
+        known_directory_exists = os.path.isdir(directory)
+        forget_output_directories()
+        make_output_directory(directory)
+        # then
+        assert not known_directory_exists
+        assert os.path.isdir(directory)
+
+
+def test_create_output_write_pool_disabled():
+    assert create_output_write_pool({}) is None
+
+
+def test_output_write_pool():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        write_pool = OutputWritePool(2, queue_size=1)
+        # when
+        for index in range(10):
+            output_file = OneShotOutputWriter(output_dir + "/sample{}.json".format(index), "utf8", "\n", write_pool)
+            output_file.write("{}\n".format(index))
+            output_file.close()
+        write_pool.wait()
+        write_pool.close()
+        # then
+        for index in range(10):
+            with open(output_dir + "/sample{}.json".format(index), "rb") as input_file:
+                assert "{}\n".format(index).encode("utf8") == input_file.read()
+
+
+def test_output_write_pool_same_path_in_order():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        write_pool = OutputWritePool(4)
+        # when
+        for index in range(200):
+            # payloads of different sizes, a longer one must not leave its tail after a shorter one
+            write_pool.submit(output_dir + "/sample{}.json".format(index % 3), str(index).encode() * (index % 7 + 1))
+        write_pool.wait()
+        write_pool.close()
+        # then
+        for index in (197, 198, 199):
+            with open(output_dir + "/sample{}.json".format(index % 3), "rb") as input_file:
+                assert str(index).encode() * (index % 7 + 1) == input_file.read()
+
+
+def test_output_write_pool_error():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        write_pool = OutputWritePool(1)
+        # when
+        write_pool.submit(output_dir + "/missing/sample.json", b"{}")
+        with pytest.raises(Exception) as excinfo:
+            write_pool.wait()
+        write_pool.close()
+        # then
+        assert "Unable to write output file " + output_dir + "/missing/sample.json" in str(excinfo.value)
+        with pytest.raises(Exception):
+            write_pool.submit(output_dir + "/sample.json", b"{}")
+
+
+def test_flush_output_files_waits_for_write_pool():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        write_pool = OutputWritePool(1)
+        for index in range(5):
+            write_pool.submit(output_dir + "/sample{}.json".format(index), b"{}")
+        # when
+        flush_output_files({}, {}, {}, {}, write_pool)
+        # then
+        assert 5 == len(os.listdir(output_dir))
+        write_pool.close()
+
+
+def written_lines(record_count):
+    yield json.dumps({"type": "SCHEMA", "stream": "my-stream", "schema": {"type": "object"}, "key_properties": ["id"]})
+    for index in range(record_count):
+        yield json.dumps({"type": "RECORD", "stream": "my-stream", "record": {"id": index, "tags": []}})
+    yield json.dumps({"type": "STATE", "stream": "my-stream", "value": {"bookmark": record_count}})
+
+
+def build_write_pool_config(output_dir, output_file_name):
+    return {
+        "disable_collection": True,
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "output_dir": output_dir,
+        "output_write_threads": 2,
+        "output_write_queue_size": 2,
+        "template_list": [
+            {
+                "header_template_name": "json/sample_header.template.json",
+                "data_template_name": "json/sample.template.json",
+                "footer_template_name": "json/sample_footer.template.json",
+                "output_file_name": output_file_name,
+                "one_file_per_record": True
+            }
+        ]
+    }
+
+
+def test_persist_lines_with_output_write_pool():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        config = build_write_pool_config(output_dir, "sample{id}.json")
+        # when
+        state = persist_lines(config, written_lines(20))
+        # then
+        assert {"bookmark": 20} == state
+        assert 20 == len(os.listdir(output_dir))
+        with open(output_dir + "/sample7.json", encoding="utf8", newline="") as input_file:
+            assert '"My-ID": "7"' in input_file.read()
+
+
+def test_persist_lines_with_output_write_pool_same_file_name():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        config = build_write_pool_config(output_dir, "sample.json")
+        config["output_write_threads"] = 4
+        # when
+        persist_lines(config, written_lines(50))
+        # then
+        with open(output_dir + "/sample.json", encoding="utf8", newline="") as input_file:
+            assert '"My-ID": "49"' in input_file.read()
+
+
+def test_persist_lines_with_output_write_pool_error():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        # the files cannot be created, a directory has the same name
+        os.makedirs(output_dir + "/sample.json")
+        config = build_write_pool_config(output_dir, "sample.json")
+        # when
+        with pytest.raises(Exception) as excinfo:
+            persist_lines(config, written_lines(3))
+        # then
+        assert "Unable to write output file" in str(excinfo.value)
+
+
+def test_create_written_files_disabled():
+    assert create_written_files({}) is None
+
+
+def test_written_files_sync(monkeypatch):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        synced = []
+        fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+        written_files = WrittenFiles()
+        open_file = open(output_dir + "/open.txt", "w")
+        closed_file = open(output_dir + "/closed.txt", "w")
+        closed_file.close()
+        renamed_file = open(output_dir + "/renamed.txt.tmp", "w")
+        renamed_file.close()
+        os.replace(output_dir + "/renamed.txt.tmp", output_dir + "/renamed.txt")
+        written_files.add(open_file, output_dir + "/open.txt", output_dir + "/open.txt")
+        written_files.add(closed_file, output_dir + "/closed.txt", output_dir + "/closed.txt")
+        written_files.add(renamed_file, output_dir + "/renamed.txt.tmp", output_dir + "/renamed.txt")
+        # when
+        written_files.sync()
+        first_sync = len(synced)
+        written_files.sync()
+        open_file.close()
+        # then
+        assert 3 == first_sync
+        # only the open file is synced again
+        assert 4 == len(synced)
+
+
+def test_persist_lines_fsync_output_without_os_sync(monkeypatch):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        def sync():
+            raise Exception("os.sync must not be called")
+        monkeypatch.setattr(os, "sync", sync, raising=False)
+        synced = []
+        fsync = os.fsync
+        monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+        config = build_write_pool_config(output_dir, "sample{id}.json")
+        config.update({"fsync_output": True, "state_emit_every_records": 5, "atomic_output": True,
+                       "atomic_output_fsync_batch": 3})
+        # when
+        persist_lines(config, written_lines(10))
+        # then
+        assert 10 == len(os.listdir(output_dir))
+        assert 10 <= len(synced)
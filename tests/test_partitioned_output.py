@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from target_mako import load_template_list_from_config, open_output_file_list, persist_lines
+from target_mako.dict_proxy import lazy_namespace
+
+RECORDS = [{"id": 1, "country": "fr"}, {"id": 2, "country": "us"}, {"id": 3, "country": "de"},
+           {"id": 4, "country": "fr"}, {"id": 5, "country": "us"}, {"id": 6, "country": "fr"}]
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "first ${record.id}", "line.txt": "${record.id}", "footer.txt": "last ${record.id}"})
+
+
+def partitioned_config(max_open_files):
+    return {"output_file_name": "{country}/sample.txt", "partition_output_files": True,
+            "max_open_files": max_open_files}
+
+
+@pytest.mark.parametrize("max_open_files", [1, 2, 10])
+@pytest.mark.parametrize("output_buffer_size", [None, 4])
+def test_persist_lines_partitioned(max_open_files, output_buffer_size, build_config, stream_lines, read_file,
+                                   output_dir):
+    # given
+    config = build_config(partitioned_config(max_open_files), output_buffer_size=output_buffer_size)
+    # when
+    state = persist_lines(config, stream_lines(RECORDS))
+    # then
+    assert {"bookmark": 6} == state
+    assert ["de", "fr", "us"] == sorted(os.listdir(output_dir))
+    assert "first 1\n1\n4\n6\nlast 6\n" == read_file(output_dir + "/fr/sample.txt")
+    assert "first 2\n2\n5\nlast 5\n" == read_file(output_dir + "/us/sample.txt")
+    assert "first 3\n3\nlast 3\n" == read_file(output_dir + "/de/sample.txt")
+
+
+def test_persist_lines_partitioned_with_render_processes(build_config, stream_lines):
+    # given
+    config = build_config(partitioned_config(10), render_processes=1)
+    # when
+    with pytest.raises(Exception) as excinfo:
+        persist_lines(config, stream_lines(RECORDS))
+    # then
+    assert "not supported with render_processes" in str(excinfo.value)
+
+
+def test_partitioned_without_footer_keeps_no_record(build_config, read_file, output_dir):
+    # given
+    config = build_config(dict(partitioned_config(2), footer_template_name=""))
+    templates = load_template_list_from_config(config, "my-stream")
+    partitioned_output_files = open_output_file_list(config, templates, "my-stream")["{country}/sample.txt"]
+    # when
+    for record in RECORDS:
+        partitioned_output_files.render_record(record, lazy_namespace(record, "record"), None, {})
+    partitioned_output_files.render_footers_and_close({})
+    # then
+    assert {} == partitioned_output_files.last_values
+    assert 3 == len(partitioned_output_files.started_paths)
+    assert "first 1\n1\n4\n6\n" == read_file(output_dir + "/fr/sample.txt")
+
+
+def test_persist_lines_partitioned_one_file_per_record(build_config, stream_lines):
+    # given
+    config = build_config(dict(partitioned_config(10), one_file_per_record=True))
+    # when
+    with pytest.raises(Exception) as excinfo:
+        persist_lines(config, stream_lines(RECORDS))
+    # then
+    assert "not supported with partition_output_files" in str(excinfo.value)
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako.render_pool import RecordRenderPool
+
+
+def build_config(output_dir, render_processes=None):
+    config = {
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "csv/sample_header.template.csv",
+                "output_file_name": "sample.csv"
+            },
+            {
+                "header_template_name": "json/sample_header.template.json",
+                "data_template_name": "json/sample.template.json",
+                "footer_template_name": "json/sample_footer.template.json",
+                "output_file_name": "sample{record_index}.json",
+                "one_file_per_record": True
+            }
+        ]
+    }
+    if render_processes:
+        config["render_processes"] = render_processes
+        config["render_chunk_size"] = 3
+    return config
+
+
+def build_lines(record_count):
+    lines = [json.dumps({"type": "SCHEMA", "stream": "my-stream", "key_properties": ["id"],
+                         "schema": {"type": "object", "properties": {"id": {"type": "integer"}}}})]
+    for index in range(record_count):
+        lines.append(json.dumps({"type": "RECORD", "stream": "my-stream",
+                                 "record": {"id": index, "name": "Ward" if index % 2 else None, "checked": True,
+                                            "dimensions": {"width": index, "height": 2}, "tags": ["a", "b"]}}))
+    return lines
+
+
+def read_output_files(output_dir):
+    output_files = {}
+    for file_name in os.listdir(output_dir):
+        with open(os.path.join(output_dir, file_name), "rb") as input_file:
+            output_files[file_name] = input_file.read()
+    return output_files
+
+
+def test_persist_lines_render_processes():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        persist_lines(build_config(output_dir + "/sequential"), build_lines(11))
+        # when
+        persist_lines(build_config(output_dir + "/pool", 2), build_lines(11))
+        # then
+        sequential_files = read_output_files(output_dir + "/sequential")
+        assert 12 == len(sequential_files)
+        assert sequential_files == read_output_files(output_dir + "/pool")
+
+
+def test_persist_lines_render_processes_invalid_record():
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        lines = build_lines(5)
+        lines.append(json.dumps({"type": "RECORD", "stream": "my-stream", "record": {"id": "not an integer"}}))
+        # when
+        with pytest.raises(Exception) as exc_info:
+            persist_lines(build_config(output_dir, 2), lines)
+        # then
+        assert "is not of type 'integer'" in str(exc_info.value)
+
+
+def test_render_pool_close_drops_pending_chunks():
+    # given
+    render_pool = RecordRenderPool(build_config("output"), "my-stream", 1, chunk_size=1)
+    render_pool.schema = {"type": "object"}
+    # two chunks waiting to be written
+    for index in range(2):
+        render_pool.submit(index, {"id": index})
+    pending_futures = [future for _, _, future in render_pool.pending_chunks]
+    shutdown_calls = []
+    shutdown = render_pool.executor.shutdown
+    # python 3.8 executors have no cancel_futures argument
+    render_pool.executor.shutdown = lambda wait=True: shutdown_calls.append(wait) or shutdown(wait)
+    # when
+    render_pool.close()
+    # then
+    assert [True] == shutdown_calls
+    assert not render_pool.pending_chunks
+    assert all(future.done() for future in pending_futures)
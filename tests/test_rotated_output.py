@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from target_mako import persist_lines
+
+
+@pytest.fixture(autouse=True)
+def templates(write_templates):
+    write_templates({"header.txt": "first ${record.id}", "line.txt": "line ${record.id}",
+                     "footer.txt": "last ${record.id}"})
+
+
+@pytest.fixture
+def rotated_config(build_config):
+    def build(output_file_name="sample_{part}.txt", **options):
+        return build_config(dict(options, output_file_name=output_file_name, output_file_EOL="\r\n"),
+                            fsync_output=True, state_emit_every_records=2)
+    return build
+
+
+def rotated_records(record_count):
+    return [{"id": index} for index in range(1, record_count + 1)]
+
+
+def test_persist_lines_max_records_per_file(rotated_config, stream_lines, read_file, output_dir):
+    # given
+    config = rotated_config(max_records_per_file=2)
+    # when
+    persist_lines(config, stream_lines(rotated_records(5)))
+    # then
+    assert ["sample_1.txt", "sample_2.txt", "sample_3.txt"] == sorted(os.listdir(output_dir))
+    assert "first 1\r\nline 1\r\nline 2\r\nlast 2\r\n" == read_file(output_dir + "/sample_1.txt")
+    assert "first 3\r\nline 3\r\nline 4\r\nlast 4\r\n" == read_file(output_dir + "/sample_2.txt")
+    assert "first 5\r\nline 5\r\nlast 5\r\n" == read_file(output_dir + "/sample_3.txt")
+
+
+def test_persist_lines_max_bytes_per_file(rotated_config, stream_lines, read_file, output_dir):
+    # given
+    # header and first line are 17 bytes, the second record goes in a new part
+    config = rotated_config("part{part:02d}/sample.txt", max_bytes_per_file=17)
+    # when
+    persist_lines(config, stream_lines(rotated_records(3)))
+    # then
+    assert ["part01", "part02", "part03"] == sorted(os.listdir(output_dir))
+    assert "first 2\r\nline 2\r\nlast 2\r\n" == read_file(output_dir + "/part02/sample.txt")
+
+
+def test_persist_lines_max_bytes_per_file_under_limit(rotated_config, stream_lines, read_file, output_dir):
+    # given
+    config = rotated_config(max_bytes_per_file=18, output_buffer_size=4)
+    # when
+    persist_lines(config, stream_lines(rotated_records(2)))
+    # then
+    assert ["sample_1.txt"] == os.listdir(output_dir)
+    assert "first 1\r\nline 1\r\nline 2\r\nlast 2\r\n" == read_file(output_dir + "/sample_1.txt")
+
+
+def test_persist_lines_rotation_without_part_field(rotated_config, stream_lines):
+    # given
+    config = rotated_config("sample.txt", max_records_per_file=2)
+    # when
+    with pytest.raises(Exception) as excinfo:
+        persist_lines(config, stream_lines(rotated_records(3)))
+    # then
+    assert "output_file_name sample.txt must contain the {part} field" in str(excinfo.value)
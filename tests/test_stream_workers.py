@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from target_mako import persist_lines
+from target_mako import stream_workers
+from target_mako.stream_workers import StreamWorker
+
+
+def build_config(output_dir, stream_workers=None):
+    config = {
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "output_dir": output_dir,
+        "template_list": [
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "",
+                "output_file_name": "sample.csv"
+            }
+        ],
+        "stream_configs": {
+            "stream-1": {"output_dir": output_dir + "/stream-1"},
+            "stream-2": {"output_dir": output_dir + "/stream-2"}
+        }
+    }
+    if stream_workers:
+        config["stream_workers"] = stream_workers
+    return config
+
+
+def build_lines():
+    lines = []
+    for stream in ["stream-1", "stream-2"]:
+        lines.append(json.dumps({"type": "SCHEMA", "stream": stream, "schema": {"type": "object"},
+                                 "key_properties": ["id"]}))
+    for index in range(20):
+        stream = "stream-1" if index % 3 else "stream-2"
+        lines.append(json.dumps({"type": "RECORD", "stream": stream,
+                                 "record": {"id": index, "name": "Ward", "checked": True, "tags": ["a"]}}))
+        if index % 5 == 0:
+            lines.append(json.dumps({"type": "STATE", "stream": stream, "value": {"bookmark": index}}))
+    lines.append(json.dumps({"type": "STATE", "stream": "stream-1", "value": {"bookmark": "last"}}))
+    return lines
+
+
+def read_output_files(output_dir):
+    output_files = {}
+    for stream in ["stream-1", "stream-2"]:
+        with open(os.path.join(output_dir, stream, "sample.csv"), "rb") as input_file:
+            output_files[stream] = input_file.read()
+    return output_files
+
+
+@pytest.mark.parametrize("stream_workers", ["thread", "process"])
+def test_persist_lines_stream_workers(stream_workers):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        sequential_state = persist_lines(build_config(output_dir + "/sequential"), build_lines())
+        # when
+        state = persist_lines(build_config(output_dir + "/workers", stream_workers), build_lines())
+        # then
+        assert {"bookmark": "last"} == state
+        assert sequential_state == state
+        assert read_output_files(output_dir + "/sequential") == read_output_files(output_dir + "/workers")
+
+
+@pytest.mark.parametrize("stream_workers", ["thread", "process"])
+def test_persist_lines_stream_workers_error(stream_workers):
+    with tempfile.TemporaryDirectory() as output_dir:
+        # given
+        lines = [json.dumps({"type": "RECORD", "stream": "stream-1", "record": {"id": 1}})]
+        # when
+        with pytest.raises(Exception) as exc_info:
+            persist_lines(build_config(output_dir, stream_workers), lines)
+        # then
+        assert "encountered before a corresponding schema" in str(exc_info.value)
+
+
+def test_persist_lines_stream_workers_unknown_mode():
+    with tempfile.TemporaryDirectory() as output_dir:
+        with pytest.raises(Exception):
+            persist_lines(build_config(output_dir, "fiber"), build_lines())
+
+
+def exiting_persist_messages(config, messages, flushed=None):
+    # the worker process is killed (out of memory for example) without reporting an error
+    for _ in messages:
+        os._exit(3)
+
+
+@pytest.mark.parametrize("message_count", [1, 20])
+def test_stream_worker_process_exited(message_count, monkeypatch):
+    # given
+    monkeypatch.setattr(stream_workers, "WORKER_CHECK_SECONDS", 0.1)
+    worker = StreamWorker({}, "my-stream", exiting_persist_messages, 'process', queue_size=2)
+    # when
+    with pytest.raises(Exception) as excinfo:
+        for index in range(message_count):
+            worker.submit({"type": "RECORD", "stream": "my-stream", "record": {"id": index}})
+        worker.finish()
+    # then
+    assert "Worker for stream my-stream exited with code 3" == str(excinfo.value)
+    with pytest.raises(Exception):
+        worker.finish()
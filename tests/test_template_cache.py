@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+import tempfile
+
+from target_mako import get_abs_path, load_template_list_from_config, main, precompile_templates
+from target_mako.template_cache import get_template_cache, reset_template_cache
+
+
+def build_config():
+    return {
+        "template_dir": "templates",
+        "cache_template_dir": "temp/mako_modules",
+        "template_list": [
+            {
+                "header_template_name": "csv/sample_header.template.csv",
+                "data_template_name": "csv/sample.template.csv",
+                "footer_template_name": "",
+                "output_file_name": "sample.csv"
+            }
+        ]
+    }
+
+
+def test_template_cache_same_lookup():
+    # given
+    template_cache = reset_template_cache()
+    # when
+    lookup = template_cache.get_lookup(get_abs_path("templates"), "temp/mako_modules")
+    same_lookup = template_cache.get_lookup(get_abs_path("templates"), "temp/mako_modules")
+    other_lookup = template_cache.get_lookup(get_abs_path("templates"), "temp/other_mako_modules")
+    # then
+    assert lookup is same_lookup
+    assert lookup is not other_lookup
+
+
+def test_template_cache_schema_sent_again():
+    # given
+    template_cache = reset_template_cache()
+    config = build_config()
+    # when
+    template_list = load_template_list_from_config(config, "my-stream")
+    template_list_again = load_template_list_from_config(config, "my-stream")
+    # then
+    assert template_list[0]["header"] is template_list_again[0]["header"]
+    assert template_list[0]["line"] is template_list_again[0]["line"]
+    assert 2 == template_cache.misses
+    assert 2 == template_cache.hits
+    assert template_cache is get_template_cache()
+
+
+def test_template_cache_shared_by_streams():
+    # given
+    template_cache = reset_template_cache()
+    config = build_config()
+    config["stream_configs"] = {"other-stream": {"template_dir": "templates/../templates"}}
+    # when
+    template_list = load_template_list_from_config(config, "my-stream")
+    same_template_list = load_template_list_from_config(config, "my-other-stream")
+    other_template_list = load_template_list_from_config(config, "other-stream")
+    # then
+    assert template_list[0]["line"] is same_template_list[0]["line"]
+    assert template_list[0]["line"] is not other_template_list[0]["line"]
+    assert 4 == template_cache.misses
+    assert 2 == template_cache.hits
+
+
+def test_precompile_templates():
+    # given
+    reset_template_cache()
+    config = build_config()
+    config["stream_configs"] = {"other-stream": {"template_list": [
+        {
+            "header_template_name": "",
+            "data_template_name": "json/sample.template.json",
+            "footer_template_name": "json/sample_footer.template.json",
+            "output_file_name": "sample.json"
+        }
+    ]}}
+    with tempfile.TemporaryDirectory() as cache_template_dir:
+        config["cache_template_dir"] = cache_template_dir
+        # when
+        compile_times = precompile_templates(config)
+        # then
+        compiled_templates = [template_name for _, template_name, _ in compile_times]
+        assert ["csv/sample_header.template.csv", "csv/sample.template.csv", "json/sample.template.json",
+                "json/sample_footer.template.json"] == compiled_templates
+        assert os.path.isfile(os.path.join(cache_template_dir, "json", "sample.template.json.py"))
+
+
+def test_main_precompile(monkeypatch):
+    # given
+    reset_template_cache()
+    config = build_config()
+    with tempfile.TemporaryDirectory() as cache_template_dir:
+        config["cache_template_dir"] = cache_template_dir
+        config_path = os.path.join(cache_template_dir, "config.json")
+        with open(config_path, "w") as config_file:
+            json.dump(config, config_file)
+        monkeypatch.setattr(sys, "argv", ["target-mako", "--precompile", "-c", config_path])
+        # when
+        main()
+        # then
+        assert os.path.isfile(os.path.join(cache_template_dir, "csv", "sample.template.csv.py"))
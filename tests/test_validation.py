@@ -0,0 +1,98 @@
+import builtins
+import importlib.util
+
+import pytest
+
+from target_mako import load_record_validator
+from target_mako.validation import RecordValidationError, RecordValidator
+
+# "compiled" needs the optional fastjsonschema package
+VALIDATION_MODES = ["full", pytest.param("compiled", marks=pytest.mark.skipif(
+    importlib.util.find_spec("fastjsonschema") is None, reason="fastjsonschema is not installed"))]
+
+SCHEMA = {"type": "object", "properties": {"id": {"type": "integer"}, "name": {"type": ["null", "string"]}}}
+
+
+@pytest.mark.parametrize("mode", VALIDATION_MODES)
+def test_record_validator_valid_record(mode):
+    # given
+    validator = RecordValidator("my-stream", SCHEMA, mode)
+    # when
+    validator.validate({"id": 1, "name": None})
+    # then
+    assert validator.mode == mode
+    assert validator.record_count == 1
+
+
+@pytest.mark.parametrize("mode", VALIDATION_MODES)
+def test_record_validator_invalid_record(mode):
+    # given
+    validator = RecordValidator("my-stream", SCHEMA, mode)
+    validator.validate({"id": 1})
+    # when
+    with pytest.raises(RecordValidationError) as excinfo:
+        validator.validate({"id": "not a number"})
+    # then
+    assert "Record 2 of stream my-stream does not match the schema ({} validation)".format(mode) \
+           in str(excinfo.value)
+
+
+def test_record_validator_off():
+    # given
+    validator = RecordValidator("my-stream", SCHEMA, "off")
+    # when
+    validator.validate({"id": "not a number"})
+    # then
+    assert validator.record_count == 1
+
+
+def test_record_validator_sample():
+    # given
+    validator = RecordValidator("my-stream", SCHEMA, "sample", sample_rate=3)
+    validator.validate({"id": 1})
+    # when
+    validator.validate({"id": "second record is not validated"})
+    validator.validate({"id": "third record is not validated"})
+    with pytest.raises(RecordValidationError) as excinfo:
+        validator.validate({"id": "fourth record is validated"})
+    # then
+    assert "Record 4 of stream my-stream" in str(excinfo.value)
+
+
+def test_record_validator_unknown_mode():
+    with pytest.raises(Exception) as excinfo:
+        RecordValidator("my-stream", SCHEMA, "partial")
+    assert "Unknown record_validation mode partial" in str(excinfo.value)
+
+
+def test_record_validator_compiled_without_fastjsonschema(monkeypatch):
+    # given
+    original_import = builtins.__import__
+
+    def import_without_fastjsonschema(name, *args, **kwargs):
+        if name == "fastjsonschema":
+            raise ImportError(name)
+        return original_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", import_without_fastjsonschema)
+    # when
+    validator = RecordValidator("my-stream", SCHEMA, "compiled")
+    # then
+    assert validator.mode == "full"
+    with pytest.raises(RecordValidationError):
+        validator.validate({"id": "not a number"})
+
+
+def test_load_record_validator_stream_config():
+    # given
+    config = {"record_validation": "sample", "record_validation_sample_rate": 10,
+              "stream_configs": {"other-stream": {"record_validation": "off"}}}
+    # when
+    validator = load_record_validator(config, "my-stream", SCHEMA)
+    other_validator = load_record_validator(config, "other-stream", SCHEMA)
+    default_validator = load_record_validator({}, "my-stream", SCHEMA)
+    # then
+    assert validator.mode == "sample"
+    assert validator.sample_rate == 10
+    assert other_validator.mode == "off"
+    assert default_validator.mode == "full"